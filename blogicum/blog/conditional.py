@@ -0,0 +1,113 @@
+"""Conditional GET for the post feeds and the post page.
+
+The validators are computed before the page is rendered: one aggregate
+query over the visible posts of a feed, or the post itself for its page.
+``Post.updated_at`` changes on every save of the post and of its comments
+(comments are written through ``touch_posts``) and when the author or a
+commenter changes their username, which the cards and comments print.  The
+category and location state is covered by the reference registry version
+and the profile fields shown on the profile page are part of its ETag.
+A client holding the current ETag gets 304 Not Modified without the page
+being rendered.  ``Last-Modified`` alone would miss those changes, so the
+pages do not send it.
+
+The pages differ per user (header, edit links, comment form), so the user
+is part of the ETag and the responses are private, unless the view
+renders a public page (see ``split``).
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Max
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from .models import Comment, Post
+from .registry import registry
+
+User = get_user_model()
+
+
+def make_etag(*parts):
+    digest = hashlib.md5(
+        '|'.join(str(part) for part in parts).encode()
+    ).hexdigest()
+    return f'W/"{digest}"'
+
+
+def touch_posts(post_ids):
+    return Post.objects.filter(pk__in=post_ids).update(
+        updated_at=timezone.now()
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def touch_commented_post(instance, **kwargs):
+    touch_posts([instance.post_id])
+
+
+@receiver(pre_save, sender=User)
+def touch_renamed_user_posts(instance, update_fields=None, **kwargs):
+    if instance.pk is None or (
+        update_fields is not None and 'username' not in update_fields
+    ):
+        return
+    username = User.objects.filter(pk=instance.pk).values_list(
+        'username', flat=True
+    ).first()
+    if username is None or username == instance.username:
+        return
+    Post.objects.filter(author=instance.pk).update(updated_at=timezone.now())
+    touch_posts(
+        Comment.objects.filter(author=instance.pk).order_by().values('post_id')
+    )
+
+
+def feed_state(queryset):
+    """Count, newest modification and newest publication of the posts."""
+    state = queryset.order_by().aggregate(
+        count=Count('pk'),
+        updated_at=Max('updated_at'),
+        pub_date=Max('pub_date'),
+    )
+    return state['count'], state['updated_at'], state['pub_date']
+
+
+class ConditionalGetMixin:
+    """Answer GET with 304 when the client's ETag is current.
+
+    Subclasses return the parts of the ETag from ``get_validators``.
+    """
+
+    public = False
+
+    def get_user(self, owner=None):
+        return self.request.user
+
+    def get_validators(self):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        parts = self.get_validators()
+        user = self.get_user()
+        etag = make_etag(
+            request.get_full_path(), user.pk or '', user.get_username(),
+            registry.version(),
+            *parts,
+        )
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        response['ETag'] = etag
+        if self.public:
+            patch_cache_control(
+                response, public=True, max_age=0,
+                s_maxage=settings.SPLIT_RENDERING_MAX_AGE,
+            )
+        else:
+            patch_cache_control(response, private=True, max_age=0)
+        return response
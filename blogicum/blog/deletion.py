@@ -0,0 +1,188 @@
+"""Set-based deletion of posts and users with their comments.
+
+Django's collector loads every post of a user into Python before it
+deletes them.  Here the cascade is expressed as plain DELETE statements
+instead, and subtrees larger than ``BULK_DELETE_THRESHOLD`` comments are
+tombstoned (``deleted_on``) at once and left to the ``purge_deleted``
+command, which removes them in batches; the request that asked for the
+deletion returns immediately and no queued work is lost on a restart.
+
+With ``BLOG_SOFT_DELETE`` enabled posts and comments are only tombstoned,
+deleted users are deactivated and recorded in ``DeletedUser``, and the
+``purge_deleted`` command removes all of them off-peak.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from .conditional import touch_posts
+from .models import Comment, DeletedUser, Post
+
+BULK_DELETE_THRESHOLD = 1000
+PURGE_BATCH_SIZE = 5000
+
+
+def _raw_delete(queryset):
+    """DELETE the rows of ``queryset`` in one statement, without signals.
+
+    ``QuerySet.delete()`` loads every comment to send ``post_delete`` to
+    ``conditional.touch_commented_post``, which then updates the post once
+    per comment; that is the cost this module exists to avoid, and the
+    callers touch or remove the posts themselves.  The private
+    ``QuerySet._raw_delete`` (Django 3.2, used by the collector for its own
+    fast deletes) issues the bare DELETE; if a Django upgrade removes it,
+    fall back to the documented path.
+    """
+    raw_delete = getattr(queryset, '_raw_delete', None)
+    if raw_delete is None:
+        deleted, _ = queryset.delete()
+        return deleted
+    return raw_delete(queryset.db)
+
+
+def delete_in_batches(queryset, batch_size):
+    """Yield the number of rows removed by each short DELETE transaction."""
+    model = queryset.model
+    while True:
+        with transaction.atomic():
+            batch = list(queryset.values_list('pk', flat=True)[:batch_size])
+            if not batch:
+                return
+            deleted = _raw_delete(model.objects.filter(pk__in=batch))
+        yield deleted
+
+
+def purge_posts(post_ids, batch_size=None):
+    """Delete posts and their comments with DELETE statements.
+
+    Without ``batch_size`` every table is cleared by a single statement
+    in one transaction; with it, comments go in short transactions of at
+    most ``batch_size`` rows so locks are never held for long.
+    """
+    post_ids = list(post_ids)
+    comments = Comment.objects.filter(post_id__in=post_ids)
+    if batch_size is None:
+        with transaction.atomic():
+            deleted = _raw_delete(comments)
+            deleted += _raw_delete(Post.objects.filter(pk__in=post_ids))
+        return deleted
+    deleted = sum(delete_in_batches(comments, batch_size))
+    with transaction.atomic():
+        deleted += _raw_delete(Post.objects.filter(pk__in=post_ids))
+    return deleted
+
+
+def purge_batches(batch_size=PURGE_BATCH_SIZE, deleted_before=None):
+    """Yield rows removed per batch for everything tombstoned.
+
+    Only rows tombstoned on or before ``deleted_before`` are touched.
+    """
+    deleted_before = deleted_before or timezone.localdate()
+    comments = Comment.objects.filter(deleted_on__lte=deleted_before)
+    posts = Post.objects.filter(deleted_on__lte=deleted_before)
+    yield from delete_in_batches(comments, batch_size)
+    yield from delete_in_batches(
+        Comment.objects.filter(post__in=posts), batch_size
+    )
+    yield from delete_in_batches(posts, batch_size)
+    yield from delete_users_in_batches(
+        get_user_model().objects.filter(
+            pk__in=DeletedUser.objects.filter(
+                deleted_on__lte=deleted_before
+            ).values('user_id'),
+            post__isnull=True,
+            comments__isnull=True,
+        ),
+        batch_size,
+    )
+
+
+def delete_users_in_batches(queryset, batch_size):
+    """Like ``delete_in_batches`` but through the collector.
+
+    Users are referenced by tables outside the blog (sessions, admin log),
+    so they cannot be removed with a raw DELETE; their posts and comments
+    are gone by now, so the collector has little to load.
+    """
+    while True:
+        with transaction.atomic():
+            batch = list(
+                queryset.order_by().values_list('pk', flat=True)[:batch_size]
+            )
+            if not batch:
+                return
+            deleted, _ = get_user_model().objects.filter(
+                pk__in=batch
+            ).delete()
+        yield deleted
+
+
+def tombstone(queryset):
+    return queryset.update(deleted_on=timezone.localdate())
+
+
+def delete_posts(queryset):
+    """Delete the posts of ``queryset``; returns True if done right away."""
+    post_ids = list(queryset.values_list('pk', flat=True))
+    if settings.BLOG_SOFT_DELETE:
+        tombstone(Post.objects.filter(pk__in=post_ids))
+        return False
+    comment_count = Comment.objects.filter(post_id__in=post_ids).count()
+    if comment_count <= BULK_DELETE_THRESHOLD:
+        purge_posts(post_ids)
+        return True
+    tombstone(Post.objects.filter(pk__in=post_ids))
+    return False
+
+
+def delete_post(post):
+    return delete_posts(Post.objects.filter(pk=post.pk))
+
+
+def delete_comment(comment):
+    if settings.BLOG_SOFT_DELETE:
+        tombstone(Comment.objects.filter(pk=comment.pk))
+        touch_posts([comment.post_id])
+    else:
+        comment.delete()
+
+
+def delete_user(user):
+    """Delete a user after removing their content with set-based DELETEs.
+
+    A user with a large subtree is deactivated at once and, like in soft
+    mode, recorded in ``DeletedUser`` so that ``purge_deleted`` removes
+    them after their tombstoned posts.  In soft mode the user is
+    deactivated, their content tombstoned and everything is left to
+    ``purge_deleted``.
+    """
+    if settings.BLOG_SOFT_DELETE:
+        return soft_delete_user(user)
+    with transaction.atomic():
+        comments = Comment.objects.filter(author=user)
+        touch_posts(comments.order_by().values('post_id'))
+        _raw_delete(comments)
+        if delete_posts(Post.objects.filter(author=user)):
+            user.delete()
+            return True
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        DeletedUser.objects.update_or_create(
+            user=user, defaults={'deleted_on': timezone.localdate()}
+        )
+    return False
+
+
+def soft_delete_user(user):
+    with transaction.atomic():
+        comments = Comment.objects.filter(author=user)
+        touch_posts(comments.order_by().values('post_id'))
+        tombstone(comments)
+        tombstone(Post.objects.filter(author=user))
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        DeletedUser.objects.update_or_create(
+            user=user, defaults={'deleted_on': timezone.localdate()}
+        )
+    return False
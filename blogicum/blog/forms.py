@@ -1,6 +1,8 @@
 from django import forms
 from django.contrib.auth import get_user_model
 from .models import Post, Comment
+from .uploads import UploadImageField
+from .widgets import AutocompleteSelect
 
 User = get_user_model()
 
@@ -16,10 +18,13 @@ class PostForm(forms.ModelForm):
         fields = '__all__'
         exclude = ('author',)
         model = Post
+        field_classes = {'image': UploadImageField}
         widgets = {
             'pub_date': forms.DateTimeInput(
                 attrs={'type': 'datetime-local'}, format='%Y-%m-%dT%H:%M'
-            )
+            ),
+            'category': AutocompleteSelect('blog:category_autocomplete'),
+            'location': AutocompleteSelect('blog:location_autocomplete'),
         }
 
 
@@ -0,0 +1,126 @@
+"""Resized variants of post images for ``srcset``.
+
+Variants are produced on the first request for them and kept under
+``MEDIA_ROOT/variants/<width>/``.  A lock makes concurrent requests for
+the same missing variant wait for one producer instead of all decoding
+the original; the locks are a fixed set of ``LOCK_SLOTS`` files, so none
+are left behind per variant.  ``collect_orphan_media`` removes variants
+of images no post uses any more.
+"""
+import fcntl
+import os
+import zlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+from django.urls import reverse
+
+from .media import image_visibility, resolve_media_path, serve_file
+from .uploads import EXIF_ORIENTATION
+
+VARIANT_WIDTHS = (320, 640, 960)
+VARIANTS_DIR = 'variants'
+JPEG_QUALITY = 85
+LOCKS_DIR = '.locks'
+LOCK_SLOTS = 64
+
+
+def oriented_size(path):
+    """(width, height) of an image as displayed, after EXIF orientation."""
+    from PIL import Image
+
+    with Image.open(path) as image:
+        width, height = image.size
+        # Orientations 5-8 turn the image by 90 degrees: exif_transpose
+        # would swap the sides, which is all that matters for the size.
+        if image.getexif().get(EXIF_ORIENTATION) in (5, 6, 7, 8):
+            return height, width
+    return width, height
+
+
+def image_size(name):
+    """(width, height) of an uploaded image, cached by name."""
+    key = f'blog:oriented_size:{name}'
+    size = cache.get(key)
+    if size is None:
+        try:
+            size = oriented_size(os.path.join(settings.MEDIA_ROOT, name))
+        except OSError:
+            return None, None
+        cache.set(key, size, timeout=None)
+    return size
+
+
+def variant_name(name, width):
+    return f'{VARIANTS_DIR}/{width}/{name}'
+
+
+def lock_path(target):
+    slot = zlib.crc32(target.encode()) % LOCK_SLOTS
+    return os.path.join(
+        settings.MEDIA_ROOT, VARIANTS_DIR, LOCKS_DIR, f'{slot}.lock'
+    )
+
+
+def variant_url(name, width):
+    return reverse('image_variant', kwargs={'width': width, 'path': name})
+
+
+def variant_widths(width):
+    """Registered widths smaller than the original one."""
+    if not width:
+        return ()
+    return tuple(w for w in VARIANT_WIDTHS if w < width)
+
+
+def make_variant(source, target, width):
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        image_format = image.format
+        image = ImageOps.exif_transpose(image)
+        height = round(image.height * width / image.width)
+        image = image.resize((width, height), Image.Resampling.LANCZOS)
+        if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_target = f'{target}.{os.getpid()}.tmp'
+        image.save(
+            tmp_target, format=image_format, quality=JPEG_QUALITY,
+            optimize=True,
+        )
+    os.replace(tmp_target, target)
+
+
+def ensure_variant(name, width):
+    source = resolve_media_path(name)
+    target = resolve_media_path(variant_name(name, width))
+    if os.path.exists(target):
+        return target
+    if not os.path.exists(source):
+        raise Http404
+    lock_file = lock_path(target)
+    os.makedirs(os.path.dirname(lock_file), exist_ok=True)
+    with open(lock_file, 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            if not os.path.exists(target):
+                make_variant(source, target, width)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+    return target
+
+
+def serve_image_variant(request, width, path):
+    if width not in VARIANT_WIDTHS:
+        raise Http404
+    name = path.replace(os.sep, '/')
+    visibility = image_visibility(request.user, name)
+    if visibility is None:
+        raise Http404
+    target = ensure_variant(name, width)
+    return serve_file(
+        request, target, variant_name(name, width), visibility,
+        etag_suffix=f'-{width}',
+    )
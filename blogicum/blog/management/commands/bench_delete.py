@@ -0,0 +1,65 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from blog.deletion import purge_posts
+from blog.models import Comment, Post
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает удаление публикации с N комментариями через коллектор '
+        'Django и через set-based удаление. База данных не изменяется.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--comments', type=int, default=100_000)
+
+    def _make_post(self, comments):
+        user = get_user_model().objects.create(
+            username=f'bench-{time.monotonic_ns()}'
+        )
+        post = Post.objects.create(
+            title='bench', text='bench', author=user, pub_date=timezone.now()
+        )
+        Comment.objects.bulk_create(
+            (
+                Comment(post=post, author=user, text='bench')
+                for _ in range(comments)
+            ),
+            batch_size=5000,
+        )
+        return post
+
+    def _measure(self, comments, delete):
+        try:
+            with transaction.atomic():
+                post = self._make_post(comments)
+                start = time.perf_counter()
+                delete(post)
+                elapsed = time.perf_counter() - start
+                raise Rollback
+        except Rollback:
+            pass
+        return elapsed
+
+    def handle(self, *args, **options):
+        comments = options['comments']
+        results = {
+            'collector': self._measure(comments, lambda post: post.delete()),
+            'set-based': self._measure(
+                comments, lambda post: purge_posts([post.pk])
+            ),
+        }
+        for name, elapsed in results.items():
+            self.stdout.write(
+                f'{name:>10}: {elapsed * 1000:.1f} мс '
+                f'({comments} комментариев)'
+            )
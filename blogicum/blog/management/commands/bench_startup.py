@@ -0,0 +1,119 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+PRELUDE = (
+    'import os; '
+    'os.environ.setdefault("DJANGO_SETTINGS_MODULE", "blogicum.settings"); '
+)
+SCENARIOS = {
+    'setup': 'import django; django.setup()',
+    'worker': (
+        'from django.core.wsgi import get_wsgi_application; '
+        'get_wsgi_application(); '
+        'from django.urls import get_resolver; '
+        'get_resolver().url_patterns'
+    ),
+}
+PROJECT_PACKAGES = ('blog', 'blogicum', 'pages', 'monitoring')
+
+
+def parse_importtime(output):
+    """[(depth, name, self_us, cumulative_us)] from ``-X importtime``."""
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split(
+                '|'
+            )
+            self_us, cumulative_us = int(self_us), int(cumulative_us)
+        except ValueError:
+            continue
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports.append((depth, name.strip(), self_us, cumulative_us))
+    return imports
+
+
+def package_of(name):
+    parts = name.split('.')
+    if parts[0] == 'django' and len(parts) > 2:
+        return '.'.join(parts[:3])
+    return '.'.join(parts[:2]) if parts[0] == 'django' else parts[0]
+
+
+class Command(BaseCommand):
+    help = (
+        'Время запуска: django.setup() (короткие команды manage.py) и '
+        'загрузка WSGI-приложения с URL (старт обработчика), с '
+        'разбивкой времени импорта по модулям.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenario', choices=SCENARIOS, action='append',
+            help='По умолчанию — все сценарии.',
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--top', type=int, default=15)
+
+    def run(self, script, *flags):
+        return subprocess.run(
+            [sys.executable, *flags, '-c', PRELUDE + script],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+            check=True, env={**os.environ, 'PYTHONDONTWRITEBYTECODE': ''},
+        )
+
+    def handle(self, *args, **options):
+        baseline = []
+        for _ in range(options['repeat']):
+            start = time.perf_counter()
+            self.run('pass')
+            baseline.append(time.perf_counter() - start)
+        self.stdout.write(
+            f'Запуск интерпретатора: {min(baseline) * 1000:.0f} мс'
+        )
+        for scenario in options['scenario'] or SCENARIOS:
+            self.benchmark(scenario, options['repeat'], options['top'])
+
+    def benchmark(self, scenario, repeat, top):
+        script = SCENARIOS[scenario]
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            self.run(script)
+            timings.append(time.perf_counter() - start)
+        imports = parse_importtime(self.run(script, '-X', 'importtime').stderr)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{scenario}: минимум {min(timings) * 1000:.0f} мс, '
+            f'медиана {statistics.median(timings) * 1000:.0f} мс, '
+            f'модулей {len(imports)}, импорт '
+            f'{sum(item[2] for item in imports) / 1000:.0f} мс'
+        ))
+        self.stdout.write('  Импорт верхнего уровня (с вложенными):')
+        roots = sorted(
+            (item for item in imports if item[0] == 0),
+            key=lambda item: item[3], reverse=True,
+        )
+        for _, name, _, cumulative in roots[:top]:
+            self.stdout.write(f'    {cumulative / 1000:8.1f} мс  {name}')
+
+        packages = {}
+        for _, name, self_us, _ in imports:
+            package = package_of(name)
+            packages[package] = packages.get(package, 0) + self_us
+        self.stdout.write('  Собственное время по пакетам:')
+        for package, self_us in sorted(
+            packages.items(), key=lambda item: item[1], reverse=True
+        )[:top]:
+            marker = ' *' if package in PROJECT_PACKAGES else ''
+            self.stdout.write(
+                f'    {self_us / 1000:8.1f} мс  {package}{marker}'
+            )
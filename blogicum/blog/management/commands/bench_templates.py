@@ -0,0 +1,101 @@
+import json
+import subprocess
+import sys
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from blog.models import Category, Post
+from blogicum import warmup
+from blogicum.template_bundle import TEMPLATE_EXTENSIONS
+
+from .serve import probe
+
+MODES = {
+    'cold': 'без пакета, компиляция при первом запросе',
+    'bundle': 'пакет шаблонов, компиляция при первом запросе',
+    'warm': 'пакет шаблонов, компиляция при запуске',
+}
+WORKER = (
+    'import os, sys; '
+    'os.environ.setdefault("DJANGO_SETTINGS_MODULE", "blogicum.settings"); '
+    'from blogicum.wsgi import application; '
+    'from blog.management.commands.bench_templates import first_hits; '
+    'print(first_hits(application, sys.argv[1], sys.argv[2:]))'
+)
+
+
+def first_hits(application, mode, paths):
+    """Run in a fresh worker: time the first hits and count file opens."""
+    if mode == 'cold':
+        settings.TEMPLATE_BUNDLE_PATH = None
+    if mode == 'warm':
+        warmup.compile_templates()
+    opened = []
+
+    def audit(event, args):
+        if event == 'open' and str(args[0]).endswith(TEMPLATE_EXTENSIONS):
+            opened.append(args[0])
+
+    sys.addaudithook(audit)
+    result = json.loads(probe(application, None, paths))
+    result['opened'] = len(opened)
+    return json.dumps(result)
+
+
+class Command(BaseCommand):
+    help = (
+        'Время первого запроса к каждому маршруту в новом процессе: без '
+        'пакета шаблонов, с пакетом и с компиляцией шаблонов при запуске.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def paths(self):
+        paths = [
+            '/', '/pages/about/', '/pages/rules/', '/auth/login/',
+            '/auth/registration/', '/auth/password_reset/',
+        ]
+        category = Category.objects.filter(is_published=True).first()
+        if category:
+            paths.append(f'/category/{category.slug}/')
+        post = Post.objects.order_by('-pk').first()
+        if post:
+            paths.append(f'/posts/{post.pk}/')
+        user = get_user_model().objects.first()
+        if user:
+            paths.append(f'/profile/{user.username}/')
+        return paths
+
+    def handle(self, *args, **options):
+        paths = self.paths()
+        results = {mode: [] for mode in MODES}
+        for _ in range(options['repeat']):
+            for mode in MODES:
+                output = subprocess.run(
+                    [sys.executable, '-c', WORKER, mode, *paths],
+                    cwd=settings.BASE_DIR, capture_output=True, text=True,
+                    check=True,
+                ).stdout
+                results[mode].append(json.loads(output.splitlines()[-1]))
+
+        self.stdout.write(
+            f'{"маршрут":<32}' + ''.join(f'{mode:>10}' for mode in MODES)
+        )
+        for path in paths:
+            self.stdout.write(f'{path:<32}' + ''.join(
+                f'{best(results[mode], path) * 1000:8.1f}мс'
+                for mode in MODES
+            ))
+        self.stdout.write(f'{"открыто файлов шаблонов":<32}' + ''.join(
+            f'{min(r["opened"] for r in results[mode]):10}'
+            for mode in MODES
+        ))
+        for mode, title in MODES.items():
+            self.stdout.write(f'{mode}: {title}')
+
+
+def best(results, path):
+    return min(result['hits'][path] for result in results)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from blog.registry import registry
+
+
+class Command(BaseCommand):
+    help = (
+        'Собирает файл справочных таблиц (категории и местоположения), '
+        'который все рабочие процессы отображают в память. Файл '
+        'пересобирается и сам при изменении таблиц; команда нужна, чтобы '
+        'собрать его заранее при развёртывании.'
+    )
+
+    def handle(self, *args, **options):
+        version = registry.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'{registry.path} (версия {version})'
+        ))
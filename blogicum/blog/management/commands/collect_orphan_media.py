@@ -0,0 +1,155 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from blog.images import LOCKS_DIR, VARIANTS_DIR
+from blog.models import Post
+from blog.uploads import STAGING_DIR
+
+
+def scan_files(root):
+    """Yield (path, stat) for every file below root, using os.scandir."""
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield entry.path, entry.stat(follow_symlinks=False)
+        except FileNotFoundError:
+            continue
+
+
+class Command(BaseCommand):
+    help = (
+        'Находит в MEDIA_ROOT файлы изображений и их уменьшенные копии, на '
+        'которые не ссылается ни одна публикация, а также брошенные '
+        'незавершённые загрузки, и удаляет или перемещает их в карантин.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--directory', default=Post._meta.get_field('image').upload_to,
+            help='Каталог внутри MEDIA_ROOT для проверки.',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--grace', type=int, default=3600,
+            help='Не трогать файлы моложе стольких секунд: их загрузка '
+                 'может быть ещё не сохранена в базе.',
+        )
+        parser.add_argument(
+            '--quarantine', default=None,
+            help='Перемещать файлы в этот каталог вместо удаления.',
+        )
+        parser.add_argument('--dry-run', action='store_true')
+
+    def referenced_names(self):
+        return set(
+            Post.objects.exclude(image='')
+            .values_list('image', flat=True)
+            .iterator(chunk_size=self.batch_size)
+        )
+
+    def candidates(self, media_root, directory):
+        """Yield (name, source image name, path, stat) of every file.
+
+        A variant ``variants/<width>/<source>`` belongs to its source.
+        Files left in the staging directory by aborted uploads belong to
+        no image, so every one past the grace period goes.
+        """
+        for path, stat in scan_files(os.path.join(media_root, directory)):
+            name = os.path.relpath(path, media_root).replace(os.sep, '/')
+            yield name, name, path, stat
+        variants_root = os.path.join(media_root, VARIANTS_DIR)
+        for path, stat in scan_files(variants_root):
+            relative = os.path.relpath(path, variants_root).split(os.sep)
+            if relative[0] == LOCKS_DIR or len(relative) < 2:
+                continue
+            name = '/'.join([VARIANTS_DIR, *relative])
+            source = '/'.join(relative[1:])
+            if source.startswith(f'{directory.rstrip("/")}/'):
+                yield name, source, path, stat
+        for path, stat in scan_files(os.path.join(media_root, STAGING_DIR)):
+            name = os.path.relpath(path, media_root).replace(os.sep, '/')
+            yield name, None, path, stat
+
+    def sweep(self, batch):
+        """Remove a batch of candidates that are still unreferenced.
+
+        ``batch`` maps a file name to (path, size, source image name).
+        """
+        still_used = set(
+            Post.objects.filter(
+                image__in={
+                    source for _, _, source in batch.values()
+                    if source is not None
+                }
+            ).values_list('image', flat=True)
+        )
+        removed = 0
+        for name, (path, size, source) in batch.items():
+            if source in still_used:
+                continue
+            try:
+                # An upload may have reused the file since the scan.
+                if os.stat(path).st_mtime > self.cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            if self.dry_run:
+                self.stdout.write(f'  {name}')
+            elif self.quarantine:
+                target = os.path.join(self.quarantine, name)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(path, target)
+            else:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+            removed += 1
+            self.freed += size
+        return removed
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.dry_run = options['dry_run']
+        self.quarantine = options['quarantine']
+        self.freed = 0
+        media_root = str(settings.MEDIA_ROOT)
+        start = time.monotonic()
+        # Anything newer than this may belong to an upload in flight.
+        self.cutoff = time.time() - options['grace']
+
+        referenced = self.referenced_names()
+        scanned = removed = 0
+        batch = {}
+        for name, source, path, stat in self.candidates(
+            media_root, options['directory']
+        ):
+            scanned += 1
+            if source in referenced or stat.st_mtime > self.cutoff:
+                continue
+            batch[name] = (path, stat.st_size, source)
+            if len(batch) >= self.batch_size:
+                removed += self.sweep(batch)
+                batch = {}
+        if batch:
+            removed += self.sweep(batch)
+
+        elapsed = time.monotonic() - start
+        action = (
+            'Найдено' if self.dry_run
+            else 'Перемещено' if self.quarantine else 'Удалено'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено файлов: {scanned} '
+            f'({scanned / elapsed if elapsed else scanned:.0f}/с), '
+            f'ссылок в базе: {len(referenced)}. {action}: {removed}, '
+            f'{self.freed / 1024 / 1024:.1f} МБ.'
+        ))
@@ -0,0 +1,51 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.template import Origin, Template, TemplateSyntaxError, engines
+
+from blogicum.template_bundle import build, collect
+
+
+class Command(BaseCommand):
+    help = (
+        'Шаг развёртывания: проверяет, что все шаблоны компилируются, и '
+        'собирает их в пакет TEMPLATE_BUNDLE_PATH, который загрузчик '
+        'шаблонов читает вместо файловой системы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default=None,
+            help='Путь пакета (по умолчанию TEMPLATE_BUNDLE_PATH).',
+        )
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только проверить компиляцию, не записывая пакет.',
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        engine = engines['django'].engine
+        templates = collect(engine)
+        errors = []
+        for name, (path, source) in templates.items():
+            try:
+                Template(source, Origin(path, name), name, engine)
+            except TemplateSyntaxError as error:
+                errors.append(f'{name}: {error}')
+        if errors:
+            raise CommandError(
+                'Шаблоны с ошибками:\n' + '\n'.join(errors)
+            )
+        message = f'Скомпилировано шаблонов: {len(templates)}'
+        if not options['check']:
+            path = options['output'] or settings.TEMPLATE_BUNDLE_PATH
+            build(path, templates)
+            message += (
+                f', пакет {path} ({os.path.getsize(path) // 1024} КБ)'
+            )
+        self.stdout.write(
+            f'{message} за {(time.perf_counter() - start) * 1000:.0f} мс.'
+        )
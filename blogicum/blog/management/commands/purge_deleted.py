@@ -0,0 +1,69 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from blog.deletion import PURGE_BATCH_SIZE, purge_batches
+
+
+def parse_hours(value):
+    try:
+        start, end = (int(hour) for hour in value.split('-'))
+    except ValueError:
+        raise CommandError('Окно задаётся в виде ЧЧ-ЧЧ, например 1-6.')
+    return start, end
+
+
+def in_window(window, hour):
+    start, end = window
+    if start <= end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+
+class Command(BaseCommand):
+    help = (
+        'Физически удаляет помеченные как удалённые публикации и '
+        'комментарии небольшими пачками с паузами между ними.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=PURGE_BATCH_SIZE,
+            help='Сколько строк удалять за одну транзакцию.',
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0.5,
+            help='Пауза между пачками в секундах.',
+        )
+        parser.add_argument(
+            '--older-than-days', type=int, default=0,
+            help='Удалять только помеченные не позднее N дней назад.',
+        )
+        parser.add_argument(
+            '--window', type=parse_hours, default=None,
+            help='Работать только в эти часы по местному времени, '
+                 'например 1-6; вне окна команда останавливается.',
+        )
+
+    def handle(self, *args, **options):
+        window = options['window']
+        deleted_before = timezone.localdate() - timedelta(
+            days=options['older_than_days']
+        )
+        if window and not in_window(window, timezone.localtime().hour):
+            self.stdout.write('Сейчас не окно очистки, ничего не удалено.')
+            return
+        total, batches, start = 0, 0, time.monotonic()
+        for deleted in purge_batches(options['batch_size'], deleted_before):
+            total += deleted
+            batches += 1
+            if window and not in_window(window, timezone.localtime().hour):
+                self.stdout.write('Окно очистки закончилось, остановка.')
+                break
+            time.sleep(options['pause'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено строк: {total} в {batches} пачках '
+            f'за {time.monotonic() - start:.1f} с.'
+        ))
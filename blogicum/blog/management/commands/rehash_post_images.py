@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит изображения публикаций в хранилище с именами по хешу '
+        'содержимого. Старые файлы остаются для collect_orphan_media.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field('image').storage
+        batch_size = options['batch_size']
+        moved = missing = 0
+        start = time.monotonic()
+        last_pk = 0
+        while True:
+            batch = list(
+                Post.objects.filter(pk__gt=last_pk)
+                .exclude(image='')
+                .order_by('pk')
+                .only('pk', 'image')[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            changed = []
+            for post in batch:
+                if storage.is_hashed(post.image.name):
+                    continue
+                if not storage.exists(post.image.name):
+                    missing += 1
+                    continue
+                with storage.open(post.image.name) as image_file:
+                    new_name = (
+                        storage.hashed_name(post.image.name, image_file)
+                        if options['dry_run']
+                        else storage.save(post.image.name, image_file)
+                    )
+                post.image.name = new_name
+                changed.append(post)
+            if changed and not options['dry_run']:
+                Post.objects.bulk_update(changed, ['image'])
+            moved += len(changed)
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено: {moved}, файлов не найдено: {missing}, '
+            f'за {time.monotonic() - start:.1f} с.'
+        ))
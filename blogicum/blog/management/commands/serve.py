@@ -0,0 +1,239 @@
+"""Benchmark harness for preloading and copy-on-write sharing.
+
+The workers run Django's development ``WSGIServer`` and each serves one
+request at a time, so this command is for measuring startup time and
+memory only, not for production.  Production runs gunicorn with the same
+warm-up: ``gunicorn -c gunicorn.conf.py`` (see ``gunicorn.conf.py``).
+"""
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import (
+    WSGIRequestHandler,
+    WSGIServer,
+    get_internal_wsgi_application,
+)
+from django.test import RequestFactory
+
+from blogicum.warmup import warm_up
+from monitoring.memory import process_memory
+
+BENCHMARK_PATHS = ('/', '/pages/about/', '/auth/login/', '/auth/registration/')
+MB = 1024 * 1024
+
+NAIVE_WORKER = (
+    'import os, sys; '
+    'os.environ.setdefault("DJANGO_SETTINGS_MODULE", "blogicum.settings"); '
+    'from blogicum.wsgi import application; '
+    'from blog.management.commands.serve import probe, process_age; '
+    'print(probe(application, process_age(), sys.argv[1:]))'
+)
+
+
+def process_age():
+    """Seconds since this process was started (Linux only)."""
+    try:
+        with open('/proc/self/stat') as stat:
+            start_ticks = int(stat.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as uptime:
+            now = float(uptime.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return now - start_ticks / os.sysconf('SC_CLK_TCK')
+
+
+def probe(application, startup, paths):
+    """Time the first request to each path; JSON with memory numbers."""
+    host = next(
+        (host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'),
+        'localhost',
+    )
+    factory = RequestFactory()
+    hits = {}
+    for path in paths:
+        environ = factory.get(path, HTTP_HOST=host).environ
+        start = time.perf_counter()
+        response = application(environ, lambda status, headers: None)
+        b''.join(response)
+        response.close()
+        hits[path] = time.perf_counter() - start
+    return json.dumps({
+        'startup': startup,
+        'hits': hits,
+        'memory': process_memory(),
+    })
+
+
+class Command(BaseCommand):
+    help = (
+        'Стенд для замеров, не для production: приложение загружается и '
+        'прогревается один раз (шаблоны, URL, база данных, gc.freeze), '
+        'затем процессы-обработчики на отладочном сервере Django '
+        'создаются через fork. В production используйте '
+        '«gunicorn -c gunicorn.conf.py».'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bind', default='127.0.0.1:8000')
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1
+        )
+        parser.add_argument(
+            '--benchmark', action='store_true',
+            help='Сравнить с запуском процессов без предзагрузки и выйти.',
+        )
+
+    def handle(self, *args, **options):
+        application = get_internal_wsgi_application()
+        steps = warm_up()
+        for name, (result, duration) in steps.items():
+            self.stdout.write(
+                f'{name}: {result} за {duration * 1000:.1f} мс'
+            )
+        if options['benchmark']:
+            self.benchmark(application, options['workers'])
+            return
+
+        host, _, port = options['bind'].rpartition(':')
+        if not host or not port.isdigit():
+            raise CommandError('Укажите адрес в виде host:port.')
+        server = WSGIServer((host, int(port)), WSGIRequestHandler)
+        server.set_app(application)
+        self.stopping = False
+        self.workers = set()
+        for _ in range(options['workers']):
+            self.spawn(server)
+        age = process_age()
+        if age is not None:
+            self.stdout.write(f'Запуск занял {age * 1000:.0f} мс.')
+        self.stdout.write(
+            f'Обработчиков: {len(self.workers)}, адрес {options["bind"]}.'
+        )
+        time.sleep(0.5)
+        self.report_memory()
+
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        while self.workers:
+            pid, _ = os.wait()
+            self.workers.discard(pid)
+            if not self.stopping:
+                self.stdout.write(f'Процесс {pid} завершился, запускаю новый.')
+                self.spawn(server)
+        server.server_close()
+
+    def spawn(self, server):
+        pid = os.fork()
+        if pid:
+            self.workers.add(pid)
+            return
+        random.seed()
+        running = True
+
+        def stop(signum, frame):
+            nonlocal running
+            running = False
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        server.timeout = 1
+        try:
+            while running:
+                server.handle_request()
+        finally:
+            os._exit(0)
+
+    def stop(self, signum, frame):
+        self.stopping = True
+        for pid in self.workers:
+            os.kill(pid, signal.SIGTERM)
+
+    def report_memory(self):
+        rows = [('master', os.getpid())] + [
+            ('worker', pid) for pid in sorted(self.workers)
+        ]
+        for role, pid in rows:
+            memory = process_memory(pid)
+            if memory is None:
+                continue
+            self.stdout.write(
+                f'{role} {pid}: RSS {memory["rss"] / MB:.1f} МБ, '
+                f'PSS {memory["pss"] / MB:.1f} МБ, '
+                f'собственная {memory["uss"] / MB:.1f} МБ, '
+                f'общая {memory["shared"] / MB:.1f} МБ'
+            )
+
+    def benchmark(self, application, workers):
+        naive = []
+        for _ in range(workers):
+            result = subprocess.run(
+                [sys.executable, '-c', NAIVE_WORKER, *BENCHMARK_PATHS],
+                cwd=settings.BASE_DIR, capture_output=True, text=True,
+                check=True,
+            )
+            naive.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+        preloaded = []
+        children = []
+        for _ in range(workers):
+            result_read, result_write = os.pipe()
+            release_read, release_write = os.pipe()
+            forked_at = time.perf_counter()
+            pid = os.fork()
+            if pid == 0:
+                os.close(result_read)
+                os.close(release_write)
+                for _, sibling_release in children:
+                    os.close(sibling_release)
+                random.seed()
+                output = probe(
+                    application, time.perf_counter() - forked_at,
+                    BENCHMARK_PATHS,
+                )
+                os.write(result_write, output.encode())
+                os.close(result_write)
+                # Stay alive until every child has measured its memory, so
+                # shared pages are split between all of them.
+                os.read(release_read, 1)
+                os._exit(0)
+            os.close(result_write)
+            os.close(release_read)
+            with os.fdopen(result_read) as pipe:
+                preloaded.append(json.loads(pipe.read()))
+            children.append((pid, release_write))
+        for pid, release_write in children:
+            os.close(release_write)
+            os.waitpid(pid, 0)
+
+        for title, results in (
+            ('Без предзагрузки', naive), ('С предзагрузкой', preloaded),
+        ):
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            self.stdout.write(
+                '  запуск обработчика: '
+                f'{mean(r["startup"] for r in results) * 1000:.1f} мс'
+            )
+            for path in BENCHMARK_PATHS:
+                self.stdout.write(
+                    f'  первый запрос {path}: '
+                    f'{mean(r["hits"][path] for r in results) * 1000:.1f} мс'
+                )
+            memory = [r['memory'] for r in results if r['memory']]
+            if memory:
+                self.stdout.write(
+                    '  память обработчика: собственная '
+                    f'{mean(m["uss"] for m in memory) / MB:.1f} МБ, '
+                    f'PSS {mean(m["pss"] for m in memory) / MB:.1f} МБ'
+                )
+
+
+def mean(values):
+    values = [value for value in values if value is not None]
+    return sum(values) / len(values) if values else 0
@@ -0,0 +1,168 @@
+"""Serving of uploaded post images.
+
+The view checks that the image belongs to a post the user may see and
+then either hands the transfer to the front server (``X-Accel-Redirect``
+for nginx, ``X-Sendfile`` for Apache/lighttpd) or streams the file
+itself.  The fallback returns a ``FileResponse`` over the open file, so a
+WSGI server with ``wsgi.file_wrapper`` (gunicorn, uWSGI) sends it with
+``os.sendfile``; single byte ranges are supported either way.
+
+Public responses are revalidated through this view on every use and kept
+by shared caches for ``MEDIA_PUBLIC_MAX_AGE`` seconds only, so an image
+stops being served soon after its post is unpublished.
+"""
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .models import Post
+from .storage import ContentHashStorage
+from .utils import exclude_deleted, filter_published_posts
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """File object limited to ``length`` bytes starting at ``start``."""
+
+    def __init__(self, file, start, length):
+        self._file = file
+        self._remaining = length
+        self.name = file.name
+        file.seek(start)
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b''
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self._file.fileno()
+
+    def close(self):
+        self._file.close()
+
+
+def parse_range(header, size):
+    """Return (start, end) of a single satisfiable range or None."""
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        raise ValueError('Unsatisfiable range')
+    return start, end
+
+
+def image_visibility(user, name):
+    """Return 'public', 'private' or None for the posts using ``name``."""
+    posts = Post.objects.filter(image=name)
+    if filter_published_posts(posts).exists():
+        return 'public'
+    if user.is_authenticated and exclude_deleted(
+        posts.filter(author=user)
+    ).exists():
+        return 'private'
+    return None
+
+
+def resolve_media_path(path):
+    try:
+        return safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+
+
+def serve_post_image(request, path):
+    full_path = resolve_media_path(path)
+    name = path.replace(os.sep, '/')
+    visibility = image_visibility(request.user, name)
+    if visibility is None:
+        raise Http404
+    return serve_file(request, full_path, name, visibility)
+
+
+def serve_file(request, full_path, name, visibility, etag_suffix=''):
+    try:
+        stat = os.stat(full_path)
+    except FileNotFoundError:
+        raise Http404
+
+    if ContentHashStorage.is_hashed(name):
+        etag = quote_etag(
+            os.path.splitext(os.path.basename(name))[0] + etag_suffix
+        )
+    else:
+        etag = quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = _file_response(
+            request, full_path, name, stat.st_size, etag
+        )
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    if visibility == 'public':
+        # The URL stays the same when the post is unpublished, so clients
+        # revalidate every time and shared caches keep it only briefly.
+        patch_cache_control(
+            response, public=True, max_age=0,
+            s_maxage=settings.MEDIA_PUBLIC_MAX_AGE,
+        )
+    else:
+        patch_cache_control(response, private=True, max_age=0)
+    return response
+
+
+def _file_response(request, full_path, name, size, etag):
+    accel = settings.MEDIA_ACCEL
+    if accel == 'nginx':
+        response = HttpResponse()
+        response['X-Accel-Redirect'] = (
+            settings.MEDIA_ACCEL_REDIRECT_PREFIX + name
+        )
+        del response['Content-Type']
+        return response
+    if accel == 'sendfile':
+        response = HttpResponse()
+        response['X-Sendfile'] = full_path
+        del response['Content-Type']
+        return response
+
+    range_header = request.headers.get('Range', '')
+    if request.headers.get('If-Range', etag) != etag:
+        range_header = ''
+    try:
+        byte_range = parse_range(range_header, size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    image_file = open(full_path, 'rb')
+    if byte_range is None:
+        return FileResponse(image_file)
+    start, end = byte_range
+    response = FileResponse(
+        FileRange(image_file, start, end - start + 1), status=206
+    )
+    response['Content-Length'] = end - start + 1
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.16 on 2026-10-19 19:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_auto_20251224_2026'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['title'], name='blog_category_title_prefix', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['name'], name='blog_location_name_prefix', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-19 19:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_prefix_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='deleted_on',
+            field=models.DateField(blank=True, db_index=True, editable=False, null=True, verbose_name='Удалено'),
+        ),
+    ]
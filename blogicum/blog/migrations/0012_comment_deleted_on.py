@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-19 19:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_post_deleted_on'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='deleted_on',
+            field=models.DateField(blank=True, db_index=True, editable=False, null=True, verbose_name='Удалено'),
+        ),
+    ]
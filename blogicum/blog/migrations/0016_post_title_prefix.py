@@ -0,0 +1,17 @@
+# Generated by Django 3.2.16 on 2026-10-20 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0015_post_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['title'], name='blog_post_title_prefix', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.16 on 2026-10-19 20:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('blog', '0016_post_title_prefix'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedUser',
+            fields=[
+                ('deleted_on', models.DateField(blank=True, db_index=True, editable=False, null=True, verbose_name='Удалено')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'удалённый пользователь',
+                'verbose_name_plural': 'Удалённые пользователи',
+            },
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 3.2.16 on 2026-10-19 20:41
+
+from django.db import migrations, models
+
+SEARCH_KEYS = [
+    ('category', 'title'),
+    ('location', 'name'),
+    ('post', 'title'),
+]
+
+
+def fill_search_keys(apps, schema_editor):
+    for model_name, source in SEARCH_KEYS:
+        model = apps.get_model('blog', model_name)
+        objects = list(model.objects.only('pk', source))
+        for obj in objects:
+            obj.search_key = getattr(obj, source).casefold()[:256]
+        model.objects.bulk_update(objects, ['search_key'], batch_size=500)
+
+
+def index_name(model_name):
+    return f'blog_{model_name}_search_key'
+
+
+def create_prefix_indexes(apps, schema_editor):
+    """LIKE 'prefix%' can use the index only with these per backend."""
+    vendor = schema_editor.connection.vendor
+    column = schema_editor.quote_name('search_key')
+    if vendor == 'sqlite':
+        column += ' COLLATE NOCASE'
+    elif vendor == 'postgresql':
+        column += ' varchar_pattern_ops'
+    for model_name, _ in SEARCH_KEYS:
+        model = apps.get_model('blog', model_name)
+        schema_editor.execute(
+            f'CREATE INDEX {schema_editor.quote_name(index_name(model_name))}'
+            f' ON {schema_editor.quote_name(model._meta.db_table)} ({column})'
+        )
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    for model_name, _ in SEARCH_KEYS:
+        model = apps.get_model('blog', model_name)
+        schema_editor.execute(schema_editor.sql_delete_index % {
+            'table': schema_editor.quote_name(model._meta.db_table),
+            'name': schema_editor.quote_name(index_name(model_name)),
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0017_deleteduser'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='category',
+            name='blog_category_title_prefix',
+        ),
+        migrations.RemoveIndex(
+            model_name='location',
+            name='blog_location_name_prefix',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='blog_post_title_prefix',
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='search_key',
+            field=models.CharField(default='', editable=False, max_length=256, verbose_name='Ключ поиска'),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='search_key',
+            field=models.CharField(default='', editable=False, max_length=256, verbose_name='Ключ поиска'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='search_key',
+            field=models.CharField(default='', editable=False, max_length=256, verbose_name='Ключ поиска'),
+        ),
+        migrations.RunPython(fill_search_keys, migrations.RunPython.noop),
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
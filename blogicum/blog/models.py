@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from .storage import post_image_storage
+from .utils import SEARCH_KEY_LENGTH, make_search_key
 # Create your models here.
 
 User = get_user_model()
@@ -24,7 +26,55 @@ class BasePublished(models.Model):
         abstract = True
 
 
-class Category(BasePublished, BaseCreatedAt):
+class BaseDeleted(models.Model):
+    deleted_on = models.DateField(
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+        verbose_name='Удалено',
+    )
+
+    class Meta:
+        abstract = True
+
+
+class BaseSearchKey(models.Model):
+    """``search_key`` holds the case-folded ``search_key_source`` field.
+
+    The admin search and the autocomplete match it by prefix (see
+    ``utils.prefix_search``).  Its index is created by migration 0018 for
+    the backend in use: with the NOCASE collation on SQLite, whose ``LIKE``
+    uses only such an index, and with ``varchar_pattern_ops`` on
+    PostgreSQL.  That opclass only exists on PostgreSQL; SQLite ignores
+    opclasses and would get a plain index that ``LIKE`` never uses.
+    """
+
+    search_key_source = None
+    search_key = models.CharField(
+        max_length=SEARCH_KEY_LENGTH,
+        editable=False,
+        default='',
+        verbose_name='Ключ поиска',
+    )
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        self.search_key = make_search_key(
+            getattr(self, self.search_key_source)
+        )
+        update_fields = kwargs.get('update_fields')
+        if (
+            update_fields is not None
+            and self.search_key_source in update_fields
+        ):
+            kwargs['update_fields'] = {*update_fields, 'search_key'}
+        super().save(*args, **kwargs)
+
+
+class Category(BasePublished, BaseCreatedAt, BaseSearchKey):
     title = models.CharField(max_length=256, verbose_name='Заголовок')
     description = models.TextField(verbose_name='Описание')
     slug = models.SlugField(
@@ -34,6 +84,8 @@ class Category(BasePublished, BaseCreatedAt):
 символы латиницы, цифры, дефис и подчёркивание.',
     )
 
+    search_key_source = 'title'
+
     class Meta:
         verbose_name = 'категория'
         verbose_name_plural = 'Категории'
@@ -42,9 +94,11 @@ class Category(BasePublished, BaseCreatedAt):
         return self.title
 
 
-class Location(BasePublished, BaseCreatedAt):
+class Location(BasePublished, BaseCreatedAt, BaseSearchKey):
     name = models.CharField(max_length=256, verbose_name=('Название места'))
 
+    search_key_source = 'name'
+
     class Meta:
         verbose_name = 'местоположение'
         verbose_name_plural = 'Местоположения'
@@ -53,7 +107,7 @@ class Location(BasePublished, BaseCreatedAt):
         return self.name
 
 
-class Post(BasePublished, BaseCreatedAt):
+class Post(BasePublished, BaseCreatedAt, BaseDeleted, BaseSearchKey):
     title = models.CharField(max_length=256, verbose_name=('Заголовок'))
     text = models.TextField(verbose_name=('Текст'))
     author = models.ForeignKey(
@@ -71,13 +125,24 @@ class Post(BasePublished, BaseCreatedAt):
         help_text='Если установить дату и время в будущем — можно дел\
             ать отложенные публикации.',
     )
-    image = models.ImageField('Фото', upload_to='post_images', blank=True)
+    image = models.ImageField(
+        'Фото',
+        upload_to='post_images',
+        storage=post_image_storage,
+        blank=True,
+        db_index=True,
+    )
     category = models.ForeignKey(
         Category,
         verbose_name=('Категория'),
         on_delete=models.SET_NULL,
         null=True,
     )
+    updated_at = models.DateTimeField(
+        auto_now=True, db_index=True, verbose_name='Изменено'
+    )
+
+    search_key_source = 'title'
 
     class Meta:
         verbose_name = 'публикация'
@@ -87,7 +152,7 @@ class Post(BasePublished, BaseCreatedAt):
         return self.title
 
 
-class Comment(BasePublished, BaseCreatedAt):
+class Comment(BasePublished, BaseCreatedAt, BaseDeleted):
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
@@ -112,3 +177,20 @@ class Comment(BasePublished, BaseCreatedAt):
         )
 
         return f'{self.author.username}: {text_preview}'
+
+
+class DeletedUser(BaseDeleted):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name='Пользователь',
+    )
+
+    class Meta:
+        verbose_name = 'удалённый пользователь'
+        verbose_name_plural = 'Удалённые пользователи'
+
+    def __str__(self):
+        return str(self.user_id)
@@ -0,0 +1,214 @@
+"""Category and Location tables in one memory-mapped file.
+
+The registry (see ``registry``) reads the reference tables from this file.
+Every worker maps it read-only, so the rows live once in the page cache
+instead of once per worker, and model instances are built only for the
+rows a page looks up.
+
+File layout (little endian):
+    header:    magic b'BLRT', format version (H), registry version (Q),
+               number of tables (H)
+    per table: name length (H), name, rows (I), offsets of the id index,
+               the key index and the blob (Q each; key index 0 if none)
+    id index:  rows * (id Q, blob offset Q), sorted by id
+    key index: rows * (key blob offset Q, key length I, id Q), sorted by
+               the key bytes
+    blob:      every field of a row as length (I) and UTF-8 value,
+               NULL_LENGTH for None
+
+``write`` puts the file in place with ``os.replace``, so a reader maps
+either the old or the new file, never a half-written one.
+"""
+import mmap
+import os
+import struct
+
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import Category, Location
+
+MAGIC = b'BLRT'
+FORMAT_VERSION = 2
+HEADER = struct.Struct('<4sHQH')
+NAME = struct.Struct('<H')
+TABLE = struct.Struct('<IQQQ')
+ID_ROW = struct.Struct('<QQ')
+KEY_ROW = struct.Struct('<QIQ')
+FIELD = struct.Struct('<I')
+NULL_LENGTH = 0xFFFFFFFF
+
+TABLES = {
+    'category': (Category, 'slug'),
+    'location': (Location, None),
+}
+
+
+def table_fields(model):
+    return [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key
+    ]
+
+
+def _dump_table(model, key):
+    index, keys, blob = [], [], bytearray()
+    for obj in model.objects.order_by('pk').iterator():
+        index.append((obj.pk, len(blob)))
+        for field in table_fields(model):
+            if getattr(obj, field.attname) is None:
+                blob += FIELD.pack(NULL_LENGTH)
+                continue
+            data = field.value_to_string(obj).encode()
+            if field.attname == key:
+                keys.append((data, len(blob) + FIELD.size, obj.pk))
+            blob += FIELD.pack(len(data)) + data
+    keys.sort()
+    return index, keys, bytes(blob)
+
+
+def dump(version):
+    """The tables as file contents stamped with the registry version."""
+    tables = [
+        (name.encode(), key, *_dump_table(model, key))
+        for name, (model, key) in TABLES.items()
+    ]
+    position = HEADER.size + sum(
+        NAME.size + len(name) + TABLE.size for name, *_ in tables
+    )
+    head = bytearray(HEADER.pack(MAGIC, FORMAT_VERSION, version, len(tables)))
+    body = bytearray()
+    for name, key, index, keys, blob in tables:
+        index_offset = position + len(body)
+        key_offset = index_offset + len(index) * ID_ROW.size
+        blob_offset = key_offset + len(keys) * KEY_ROW.size
+        head += NAME.pack(len(name)) + name
+        head += TABLE.pack(
+            len(index), index_offset, key_offset if key else 0, blob_offset
+        )
+        for row in index:
+            body += ID_ROW.pack(*row)
+        for data, offset, pk in keys:
+            body += KEY_ROW.pack(offset, len(data), pk)
+        body += blob
+    return bytes(head + body)
+
+
+def write(path, data):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as tmp_file:
+        tmp_file.write(data)
+        tmp_file.flush()
+        os.fsync(tmp_file.fileno())
+    os.replace(tmp_path, path)
+
+
+class _Table:
+    def __init__(self, buffer, model, rows, index_offset, key_offset,
+                 blob_offset):
+        self._buffer = buffer
+        self._model = model
+        self._fields = table_fields(model)
+        self._names = [model._meta.pk.attname] + [
+            field.attname for field in self._fields
+        ]
+        self.rows = rows
+        self._index_offset = index_offset
+        self._key_offset = key_offset
+        self._blob_offset = blob_offset
+
+    def _bytes(self, offset, length):
+        start = self._blob_offset + offset
+        return bytes(self._buffer[start:start + length])
+
+    def _row(self, pk, offset):
+        values = [pk]
+        for field in self._fields:
+            (length,) = FIELD.unpack_from(
+                self._buffer, self._blob_offset + offset
+            )
+            offset += FIELD.size
+            if length == NULL_LENGTH:
+                values.append(None)
+                continue
+            value = self._bytes(offset, length).decode()
+            values.append(field.to_python(value))
+            offset += length
+        return self._model.from_db(DEFAULT_DB_ALIAS, self._names, values)
+
+    def get(self, pk):
+        low, high = 0, self.rows - 1
+        while low <= high:
+            middle = (low + high) // 2
+            row_pk, offset = ID_ROW.unpack_from(
+                self._buffer, self._index_offset + middle * ID_ROW.size
+            )
+            if row_pk < pk:
+                low = middle + 1
+            elif row_pk > pk:
+                high = middle - 1
+            else:
+                return self._row(pk, offset)
+        return None
+
+    def get_by_key(self, key):
+        if not self._key_offset:
+            raise LookupError(f'{self._model.__name__} table has no key')
+        key = key.encode()
+        low, high = 0, self.rows - 1
+        while low <= high:
+            middle = (low + high) // 2
+            offset, length, pk = KEY_ROW.unpack_from(
+                self._buffer, self._key_offset + middle * KEY_ROW.size
+            )
+            row_key = self._bytes(offset, length)
+            if row_key < key:
+                low = middle + 1
+            elif row_key > key:
+                high = middle - 1
+            else:
+                return self.get(pk)
+        return None
+
+
+class ReferenceTables:
+    """Read side over any buffer in the file format: a mapping or bytes."""
+
+    def __init__(self, buffer):
+        magic, format_version, version, count = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise ValueError('not a reference table file')
+        self.version = version
+        self._tables = {}
+        position = HEADER.size
+        for _ in range(count):
+            (length,) = NAME.unpack_from(buffer, position)
+            position += NAME.size
+            name = bytes(buffer[position:position + length]).decode()
+            position += length
+            model, _ = TABLES[name]
+            self._tables[name] = _Table(
+                buffer, model, *TABLE.unpack_from(buffer, position)
+            )
+            position += TABLE.size
+
+    @classmethod
+    def open(cls, path):
+        """Map the file; None when it is missing or in another format."""
+        try:
+            with open(path, 'rb') as table_file:
+                buffer = mmap.mmap(
+                    table_file.fileno(), 0, access=mmap.ACCESS_READ
+                )
+        except (OSError, ValueError):
+            return None
+        try:
+            return cls(buffer)
+        except (KeyError, ValueError, struct.error):
+            buffer.close()
+            return None
+
+    def get(self, name, pk):
+        return self._tables[name].get(pk)
+
+    def get_by_key(self, name, key):
+        return self._tables[name].get_by_key(key)
@@ -0,0 +1,146 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Category, Location, Post
+from .reftables import ReferenceTables, dump, write
+
+VERSION_KEY = 'blog:reference_registry:version'
+CHECK_INTERVAL = 1.0
+
+
+class ReferenceRegistry:
+    """The Category and Location tables, shared by the worker processes.
+
+    The tables are read from ``REFTABLES_PATH``, which every worker maps
+    read-only (see ``reftables``).  A version counter in the shared cache
+    tells the workers to remap after a change; the first one that finds
+    the file older than the counter rebuilds it.  A process that changed
+    the tables reads its own copy in memory until the change is committed
+    and the counter moves.
+    """
+
+    def __init__(self, path=None):
+        self._path = path
+        self._lock = threading.Lock()
+        self._version = None
+        self._changed = False
+        self._checked_at = 0.0
+        self._tables = None
+
+    @property
+    def path(self):
+        return str(self._path or settings.REFTABLES_PATH)
+
+    def _shared_version(self):
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            cache.add(VERSION_KEY, 1, timeout=None)
+            version = cache.get(VERSION_KEY, 1)
+        return version
+
+    def _open(self, version):
+        if self._changed:
+            self._changed = False
+            return ReferenceTables(dump(version))
+        tables = ReferenceTables.open(self.path)
+        if tables is not None and tables.version == version:
+            return tables
+        data = dump(version)
+        try:
+            write(self.path, data)
+        except OSError:
+            return ReferenceTables(data)
+        return ReferenceTables.open(self.path) or ReferenceTables(data)
+
+    def _ensure_fresh(self):
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < (
+            CHECK_INTERVAL
+        ):
+            return
+        with self._lock:
+            version = self._shared_version()
+            if version != self._version or self._changed:
+                self._tables = self._open(version)
+                self._version = version
+            self._checked_at = now
+
+    def category(self, pk):
+        self._ensure_fresh()
+        return self._tables.get('category', pk)
+
+    def category_by_slug(self, slug):
+        self._ensure_fresh()
+        return self._tables.get_by_key('category', slug)
+
+    def location(self, pk):
+        self._ensure_fresh()
+        return self._tables.get('location', pk)
+
+    def version(self):
+        self._ensure_fresh()
+        return self._version
+
+    def rebuild(self):
+        """Write the file for the current version, e.g. at deploy."""
+        with self._lock:
+            version = self._shared_version()
+            write(self.path, dump(version))
+            self._version = None
+        return version
+
+    def reset(self):
+        with self._lock:
+            self._version = None
+            self._changed = True
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
+            self._changed = False
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.add(VERSION_KEY, 1, timeout=None)
+
+    def _lookup(self, name, ids):
+        self._ensure_fresh()
+        return {
+            pk: self._tables.get(name, pk) for pk in ids if pk is not None
+        }
+
+    def attach(self, posts):
+        """Fill category and location of posts from the registry."""
+        posts = list(posts)
+        categories = self._lookup(
+            'category', {post.category_id for post in posts}
+        )
+        locations = self._lookup(
+            'location', {post.location_id for post in posts}
+        )
+        for post in posts:
+            category = categories.get(post.category_id)
+            if category is not None:
+                Post.category.field.set_cached_value(post, category)
+            location = locations.get(post.location_id)
+            if location is not None:
+                Post.location.field.set_cached_value(post, location)
+        return posts
+
+
+registry = ReferenceRegistry()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def invalidate_registry(**kwargs):
+    registry.reset()
+    transaction.on_commit(registry.invalidate)
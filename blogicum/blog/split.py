@@ -0,0 +1,123 @@
+"""Split rendering: one public page for everyone plus per-user fragments.
+
+With ``SPLIT_RENDERING`` the feeds and the post page are rendered as for
+an anonymous visitor and never load the session, so the responses do not
+vary on Cookie and shared caches may keep them for
+``SPLIT_RENDERING_MAX_AGE`` seconds.  The user-specific parts (header
+buttons, edit and delete links, the comment form) sit in ``data-fragment``
+containers; ``js/fragments.js`` fills them from the fragments endpoint
+when the ``USER_COOKIE`` is present.
+
+The cookie holds the id of the logged in user and is only a hint: it
+decides whether the page script asks for fragments and whether the
+profile page looks at the session to show the user their own unpublished
+posts.  The page of a post that is not public is never shared, so it
+always reads the session.  Access is always checked against
+``request.user``.
+"""
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import MiddlewareNotUsed
+from django.template.loader import render_to_string
+from django.urls import reverse
+
+from .forms import CommentForm
+from .utils import exclude_deleted
+
+USER_COOKIE = 'blogicum_user'
+
+
+def user_fragments(request, post=None):
+    """{container name: html} of the user parts of a page."""
+    fragments = {
+        'user-nav': render_to_string('includes/user_nav.html', request=request)
+    }
+    if post is None or not request.user.is_authenticated:
+        return fragments
+    context = {'post': post, 'form': CommentForm()}
+    fragments['post-actions'] = render_to_string(
+        'includes/post_actions.html', context, request
+    )
+    fragments['comment-form'] = render_to_string(
+        'includes/comment_form.html', context, request
+    )
+    comments = exclude_deleted(
+        post.comments.filter(author=request.user, is_published=True)
+    ).select_related('author')
+    for comment in comments:
+        fragments[f'comment-{comment.pk}'] = render_to_string(
+            'includes/comment_actions.html',
+            {'post': post, 'comment': comment},
+            request,
+        )
+    return fragments
+
+
+class SplitRenderingMixin:
+    """Render the page as public unless it is the user's own."""
+
+    def setup(self, request, *args, **kwargs):
+        super().setup(request, *args, **kwargs)
+        self.public = settings.SPLIT_RENDERING
+
+    def get_user(self, owner=None):
+        """The user to render for; reads the session only when needed.
+
+        A public page is rendered for AnonymousUser.  When the cookie says
+        that the visitor may be ``owner``, the page becomes private.
+        """
+        if self.public:
+            if owner is None or self.request.COOKIES.get(USER_COOKIE) != str(
+                owner.pk
+            ):
+                return AnonymousUser()
+            self.public = False
+        return self.request.user
+
+    def get_fragments_url(self):
+        return reverse('blog:fragments')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if self.public:
+            context.update(
+                user=AnonymousUser(),
+                split_rendering=True,
+                fragments_url=self.get_fragments_url(),
+                fragments_cookie=USER_COOKIE,
+            )
+        return context
+
+
+class SplitRenderingMiddleware:
+    """Keep ``USER_COOKIE`` in step with the session user.
+
+    Only responses that loaded the session anyway (login, logout, forms,
+    the fragments endpoint) update the cookie.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SPLIT_RENDERING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not request.session.accessed:
+            return response
+        user = request.user
+        user_id = str(user.pk) if user.is_authenticated else ''
+        if request.COOKIES.get(USER_COOKIE, '') == user_id:
+            return response
+        if user_id:
+            response.set_cookie(
+                USER_COOKIE, user_id,
+                max_age=settings.SESSION_COOKIE_AGE,
+                secure=settings.SESSION_COOKIE_SECURE,
+                samesite=settings.SESSION_COOKIE_SAMESITE,
+            )
+        else:
+            response.delete_cookie(
+                USER_COOKIE, samesite=settings.SESSION_COOKIE_SAMESITE
+            )
+        return response
@@ -0,0 +1,110 @@
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+HASH_NAME_RE = re.compile(
+    r'(?:^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.\w+$'
+)
+
+
+class ContentHashStorage(FileSystemStorage):
+    """Stores files under the SHA-256 of their content.
+
+    ``post_images/photo.jpg`` becomes ``post_images/ab/cd/abcd….jpg``, so
+    directories stay small and identical uploads share one file.
+    """
+
+    shard_levels = 2
+
+    @staticmethod
+    def content_hash(content):
+        precomputed = getattr(content, 'sha256', None)
+        if precomputed:
+            return precomputed
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        return digest.hexdigest()
+
+    def hashed_name(self, name, content):
+        directory, filename = posixpath.split(name.replace('\\', '/'))
+        extension = os.path.splitext(filename)[1].lower()
+        digest = self.content_hash(content)
+        shards = [
+            digest[2 * level:2 * level + 2]
+            for level in range(self.shard_levels)
+        ]
+        return posixpath.join(directory, *shards, f'{digest}{extension}')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            try:
+                # A reused orphan must look fresh to collect_orphan_media
+                # until the new reference to it is committed.
+                os.utime(self.path(name))
+                return name
+            except FileNotFoundError:
+                pass
+        return self._save(name, content)
+
+    def _save(self, name, content):
+        """Link the content in under ``name`` unless it is there already.
+
+        ``os.link`` never replaces an existing file, so two concurrent
+        uploads of the same bytes end with one file, and the hashed name
+        never shows a partly written one.  A staged upload on the same
+        filesystem is linked directly; anything else is written to a
+        temporary file next to ``name`` first.
+        """
+        full_path = self.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        if hasattr(content, 'temporary_file_path'):
+            try:
+                self._link(content.temporary_file_path(), full_path)
+                return name
+            except OSError:
+                # Another filesystem or no hard links: copy instead.
+                pass
+        fd, tmp_path = tempfile.mkstemp(
+            suffix='.tmp', dir=os.path.dirname(full_path)
+        )
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                for chunk in content.chunks():
+                    tmp_file.write(chunk)
+            self._link(tmp_path, full_path)
+        finally:
+            os.unlink(tmp_path)
+        return name
+
+    def _link(self, source, full_path):
+        try:
+            os.link(source, full_path)
+        except FileExistsError:
+            # Same hash, same bytes: someone else stored them first.
+            os.utime(full_path)
+            return
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+
+    @staticmethod
+    def is_hashed(name):
+        return bool(HASH_NAME_RE.search(name))
+
+
+def post_image_storage():
+    return ContentHashStorage()
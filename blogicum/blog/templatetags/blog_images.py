@@ -0,0 +1,30 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from blog.images import image_size, variant_url, variant_widths
+
+register = template.Library()
+
+DEFAULT_SIZES = '(max-width: 40rem) 100vw, 40rem'
+
+
+@register.simple_tag
+def post_image(post, css_class='', sizes=DEFAULT_SIZES, loading='lazy'):
+    """<img> with srcset of the registered widths and intrinsic size."""
+    name = post.image.name
+    width, height = image_size(name)
+    widths = variant_widths(width)
+    attrs = {'class': css_class, 'src': post.image.url, 'alt': post.title}
+    if widths:
+        attrs['srcset'] = ', '.join(
+            [f'{variant_url(name, w)} {w}w' for w in widths]
+            + [f'{post.image.url} {width}w']
+        )
+        attrs['sizes'] = sizes
+        attrs['src'] = variant_url(name, widths[-1])
+    if width and height:
+        attrs['width'], attrs['height'] = width, height
+    attrs['loading'] = loading
+    attrs['decoding'] = 'async'
+    return format_html('<img{}>', flatatt(attrs))
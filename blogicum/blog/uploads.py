@@ -0,0 +1,239 @@
+"""Streaming validation of post image uploads.
+
+``ImageUploadHandler`` sees the upload chunk by chunk: it enforces the
+size limit while the body is still arriving, feeds the first bytes to
+Pillow's incremental parser to reject non-images and decompression bombs
+before they are written out, and stages the file next to MEDIA_ROOT so
+that saving it is a rename rather than a copy.  When the upload is
+complete the image is decoded once to apply the EXIF orientation and
+re-encoded without the EXIF block if it carried one, and the file that
+will be stored is checked again as a whole: the streamed checks saw only
+its first bytes, and normalizing may have rewritten it.
+"""
+import hashlib
+import os
+import tempfile
+
+from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import (
+    TemporaryUploadedFile,
+    UploadedFile,
+)
+from django.core.files.uploadhandler import FileUploadHandler
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'GIF', 'WEBP'}
+SNIFF_LIMIT = 64 * 1024
+STAGING_DIR = '.uploads'
+EXIF_ORIENTATION = 0x0112
+
+
+class StagedImageFile(TemporaryUploadedFile):
+    """Temporary upload that lives on the same filesystem as MEDIA_ROOT."""
+
+    def __init__(self, name, content_type, charset, content_type_extra):
+        staging_dir = os.path.join(settings.MEDIA_ROOT, STAGING_DIR)
+        os.makedirs(staging_dir, exist_ok=True)
+        _, ext = os.path.splitext(name)
+        file = tempfile.NamedTemporaryFile(
+            suffix='.upload' + ext, dir=staging_dir
+        )
+        UploadedFile.__init__(
+            self, file, name, content_type, 0, charset, content_type_extra
+        )
+        self.sha256 = None
+        self.image_format = None
+
+
+class RejectedUpload(UploadedFile):
+    def __init__(self, name, error):
+        super().__init__(None, name, None, 0)
+        self.upload_error = error
+
+    def chunks(self, chunk_size=None):
+        return iter(())
+
+
+class ImageUploadHandler(FileUploadHandler):
+    field_name_to_handle = 'image'
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        super().new_file(field_name, file_name, *args, **kwargs)
+        self.active = field_name == self.field_name_to_handle
+        if not self.active:
+            return
+        from PIL import ImageFile
+
+        self.error = None
+        self.parser = ImageFile.Parser()
+        self.sniffed = 0
+        self.digest = hashlib.sha256()
+        self.file = StagedImageFile(
+            file_name, self.content_type, self.charset,
+            self.content_type_extra,
+        )
+
+    def reject(self, error):
+        self.error = error
+        self.file.close()
+
+    def sniff(self, raw_data):
+        if self.parser.image is not None or self.sniffed > SNIFF_LIMIT:
+            return
+        self.sniffed += len(raw_data)
+        try:
+            self.parser.feed(raw_data)
+        except Exception:
+            self.reject('Загрузите корректное изображение.')
+            return
+        image = self.parser.image
+        if image is None:
+            if self.sniffed > SNIFF_LIMIT:
+                self.reject('Загрузите корректное изображение.')
+            return
+        if image.format not in ALLOWED_FORMATS:
+            self.reject('Поддерживаются только JPEG, PNG, GIF и WebP.')
+        elif image.width * image.height > settings.POST_IMAGE_MAX_PIXELS:
+            self.reject('Слишком большое разрешение изображения.')
+        else:
+            self.file.image_format = image.format
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+        if self.error:
+            return None
+        if start + len(raw_data) > settings.POST_IMAGE_MAX_SIZE:
+            max_mb = settings.POST_IMAGE_MAX_SIZE // (1024 * 1024)
+            self.reject(f'Размер файла не должен превышать {max_mb} МБ.')
+            return None
+        self.sniff(raw_data)
+        if not self.error:
+            self.file.write(raw_data)
+            self.digest.update(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+        if not self.error and self.file.image_format is None:
+            self.reject('Загрузите корректное изображение.')
+        if self.error:
+            return RejectedUpload(self.file_name, self.error)
+        self.file.flush()
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.sha256 = self.digest.hexdigest()
+        try:
+            normalize(self.file)
+            error = check_staged(self.file)
+        except Exception:
+            error = 'Загрузите корректное изображение.'
+        if error:
+            self.file.close()
+            return RejectedUpload(self.file_name, error)
+        return self.file
+
+    def upload_interrupted(self):
+        if getattr(self, 'active', False):
+            self.file.close()
+
+
+def normalize(upload):
+    """Apply EXIF orientation and drop EXIF in one decode, if needed."""
+    from PIL import Image, ImageOps
+
+    with Image.open(upload.temporary_file_path()) as image:
+        exif = image.getexif()
+        if not exif or getattr(image, 'is_animated', False):
+            upload.seek(0)
+            return
+        orientation = exif.get(EXIF_ORIENTATION)
+        image_format = image.format
+        if orientation not in (None, 1):
+            image = ImageOps.exif_transpose(image)
+        else:
+            image.load()
+        staged = tempfile.NamedTemporaryFile(
+            suffix='.upload',
+            dir=os.path.dirname(upload.temporary_file_path()),
+        )
+        # The PNG writer copies info['exif'] into the output by itself.
+        image.info.pop('exif', None)
+        params = {'format': image_format, 'exif': b''}
+        if image.info.get('icc_profile'):
+            params['icc_profile'] = image.info['icc_profile']
+        if image_format == 'JPEG':
+            # The original quantization tables can only be kept when the
+            # pixels were not rotated.
+            if orientation in (None, 1):
+                params['quality'] = 'keep'
+            else:
+                params['quality'] = 90
+        if image_format == 'JPEG' and image.mode not in ('RGB', 'L', 'CMYK'):
+            image = image.convert('RGB')
+        image.save(staged, **params)
+    staged.flush()
+    upload.file.close()
+    upload.file = staged
+    upload.size = os.path.getsize(staged.name)
+    upload.sha256 = None
+    upload.seek(0)
+
+
+def check_staged(upload):
+    """Error message for the staged file as it will be stored, or None."""
+    from PIL import Image
+
+    if upload.size > settings.POST_IMAGE_MAX_SIZE:
+        max_mb = settings.POST_IMAGE_MAX_SIZE // (1024 * 1024)
+        return f'Размер файла не должен превышать {max_mb} МБ.'
+    with Image.open(upload.temporary_file_path()) as image:
+        if image.format not in ALLOWED_FORMATS:
+            return 'Поддерживаются только JPEG, PNG, GIF и WebP.'
+        if image.width * image.height > settings.POST_IMAGE_MAX_PIXELS:
+            return 'Слишком большое разрешение изображения.'
+        image.verify()
+        upload.image_format = image.format
+    upload.seek(0)
+    return None
+
+
+class UploadImageField(forms.ImageField):
+    """ImageField that trusts uploads already checked by the handler."""
+
+    def to_python(self, data):
+        error = getattr(data, 'upload_error', None)
+        if error:
+            raise forms.ValidationError(error, code='invalid_image')
+        if getattr(data, 'image_format', None):
+            from PIL import Image
+
+            data = forms.FileField.to_python(self, data)
+            data.content_type = Image.MIME.get(data.image_format)
+            return data
+        return super().to_python(data)
+
+
+class ImageUploadMixin:
+    """Put ImageUploadHandler in front of the default handlers.
+
+    Handlers must be set before anything reads ``request.POST``, which
+    CsrfViewMiddleware does, so the check is moved inside the view.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    def dispatch(self, request, *args, **kwargs):
+        request.upload_handlers.insert(0, ImageUploadHandler(request))
+
+        @csrf_protect
+        def protected(request, *args, **kwargs):
+            return super(ImageUploadMixin, self).dispatch(
+                request, *args, **kwargs
+            )
+
+        return protected(request, *args, **kwargs)
@@ -50,4 +50,17 @@ urlpatterns = [
         views.CommentUpdateView.as_view(),
         name='edit_comment',
     ),
+    path(
+        'fragments/', views.UserFragmentsView.as_view(), name='fragments'
+    ),
+    path(
+        'autocomplete/categories/',
+        views.CategoryAutocompleteView.as_view(),
+        name='category_autocomplete',
+    ),
+    path(
+        'autocomplete/locations/',
+        views.LocationAutocompleteView.as_view(),
+        name='location_autocomplete',
+    ),
 ]
@@ -1,6 +1,22 @@
 from django.db.models import Q, Count
 from django.utils import timezone
 
+SEARCH_KEY_LENGTH = 256
+
+
+def make_search_key(value):
+    """Case-folded value for the ``search_key`` columns.
+
+    The databases fold only ASCII in ``LIKE`` and ``LOWER()``, so the
+    folding is done here, for Cyrillic as well.
+    """
+    return value.casefold()[:SEARCH_KEY_LENGTH]
+
+
+def prefix_search(term):
+    """Case-insensitive prefix match served by the ``search_key`` index."""
+    return Q(search_key__startswith=make_search_key(term.strip()))
+
 
 def order_date(queryset):
     return queryset.order_by('-pub_date')
@@ -8,13 +24,33 @@ def order_date(queryset):
 
 def annotate_pub_coms(queryset):
     return queryset.annotate(
-        comment_count=Count('comments', filter=Q(comments__is_published=True))
+        comment_count=Count(
+            'comments',
+            filter=Q(
+                comments__is_published=True,
+                comments__deleted_on__isnull=True,
+            ),
+        )
     )
 
 
+def exclude_deleted(queryset):
+    return queryset.filter(deleted_on__isnull=True)
+
+
 def filter_published_posts(queryset):
-    return queryset.filter(
+    return exclude_deleted(queryset).filter(
         pub_date__lte=timezone.now(),
         is_published=True,
         category__is_published=True,
-    )
\ No newline at end of file
+    )
+
+
+def is_post_published(post):
+    return (
+        post.deleted_on is None
+        and post.is_published
+        and post.pub_date <= timezone.now()
+        and post.category is not None
+        and post.category.is_published
+    )
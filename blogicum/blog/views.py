@@ -1,5 +1,6 @@
 from django.shortcuts import get_object_or_404, redirect
-from django.utils import timezone
+from django.http import Http404, JsonResponse
+from django.utils.cache import add_never_cache_headers
 from blog.forms import UserUpdateForm
 from django.views.generic import (
     CreateView,
@@ -7,39 +8,68 @@ from django.views.generic import (
     ListView,
     UpdateView,
     DeleteView,
+    View,
+)
+from .utils import (
+    annotate_pub_coms,
+    exclude_deleted,
+    order_date,
+    filter_published_posts,
+    is_post_published,
+    prefix_search,
 )
-from django.db import models
-from .utils import annotate_pub_coms, order_date, filter_published_posts
 from django.contrib.auth.mixins import LoginRequiredMixin
-from blog.models import Post, Category, Comment
+from blog.models import Post, Category, Comment, Location
 from django.contrib.auth import get_user_model
 from .forms import PostForm, CommentForm
+from .conditional import ConditionalGetMixin, feed_state
+from .deletion import delete_comment, delete_post
+from .registry import registry
+from .split import SplitRenderingMixin, user_fragments
+from .uploads import ImageUploadMixin
 from django.urls import reverse
 
 User = get_user_model()
 
 
-class ProfileListView(ListView):
+class RegistryPostsMixin:
+    def paginate_queryset(self, queryset, page_size):
+        paginator, page, object_list, is_paginated = (
+            super().paginate_queryset(queryset, page_size)
+        )
+        page.object_list = registry.attach(object_list)
+        return paginator, page, page.object_list, is_paginated
+
+
+class ProfileListView(
+    SplitRenderingMixin, ConditionalGetMixin, RegistryPostsMixin, ListView
+):
     template_name = 'blog/profile.html'
     paginate_by = 10
     model = Post
 
-    def get_queryset(self):
+    def get_visible_posts(self):
         qs = super().get_queryset()
-        self.profile = get_object_or_404(
-            User, username=self.kwargs['username']
-        )
+        if getattr(self, 'profile', None) is None:
+            self.profile = get_object_or_404(
+                User, username=self.kwargs['username']
+            )
 
-        if (
-            self.request.user.is_authenticated
-            and self.request.user == self.profile
-        ):
-            queryset = qs.filter(author=self.profile)
-        else:
-            queryset = qs.filter(author=self.profile)
-            queryset = filter_published_posts(queryset)
+        user = self.get_user(owner=self.profile)
+        if user.is_authenticated and user == self.profile:
+            return exclude_deleted(qs.filter(author=self.profile))
+        return filter_published_posts(qs.filter(author=self.profile))
+
+    def get_validators(self):
+        state = feed_state(self.get_visible_posts())
+        profile = self.profile
+        return (
+            profile.pk, profile.username, profile.get_full_name(),
+            profile.is_staff, *state,
+        )
 
-        queryset = queryset.select_related('author', 'category')
+    def get_queryset(self):
+        queryset = self.get_visible_posts().select_related('author')
         queryset = annotate_pub_coms(queryset)
         return order_date(queryset)
 
@@ -49,7 +79,7 @@ class ProfileListView(ListView):
         return context
 
 
-class PostUpdateView(LoginRequiredMixin, UpdateView):
+class PostUpdateView(ImageUploadMixin, LoginRequiredMixin, UpdateView):
     model = Post
     form_class = PostForm
     template_name = 'blog/create.html'
@@ -60,7 +90,7 @@ class PostUpdateView(LoginRequiredMixin, UpdateView):
         if not post_id:
             return redirect('blog:index')
 
-        post = get_object_or_404(Post, pk=post_id)
+        post = get_object_or_404(Post, pk=post_id, deleted_on=None)
         if post.author != request.user:
             return redirect('blog:post_detail', post_id=post_id)
 
@@ -78,7 +108,15 @@ class PostDeleteView(LoginRequiredMixin, DeleteView):
 
     def get_object(self, queryset=None):
         post_id = self.kwargs['post_id']
-        return get_object_or_404(Post, pk=post_id, author=self.request.user)
+        return get_object_or_404(
+            Post, pk=post_id, author=self.request.user, deleted_on=None
+        )
+
+    def delete(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        success_url = self.get_success_url()
+        delete_post(self.object)
+        return redirect(success_url)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -105,7 +143,7 @@ class ProfileUpdateView(LoginRequiredMixin, UpdateView):
         )
 
 
-class PostCreateView(LoginRequiredMixin, CreateView):
+class PostCreateView(ImageUploadMixin, LoginRequiredMixin, CreateView):
     model = Post
     form_class = PostForm
     template_name = 'blog/create.html'
@@ -120,31 +158,45 @@ class PostCreateView(LoginRequiredMixin, CreateView):
         )
 
 
-class IndexListView(ListView):
+class IndexListView(
+    SplitRenderingMixin, ConditionalGetMixin, RegistryPostsMixin, ListView
+):
     model = Post
     template_name = 'blog/index.html'
     paginate_by = 10
 
+    def get_visible_posts(self):
+        return filter_published_posts(super().get_queryset())
+
+    def get_validators(self):
+        return feed_state(self.get_visible_posts())
+
     def get_queryset(self):
-        qs = super().get_queryset()
-        queryset = filter_published_posts(qs).select_related('author', 'category')
+        queryset = self.get_visible_posts().select_related('author')
         queryset = annotate_pub_coms(queryset)
         return order_date(queryset)
 
 
-class CategoryListView(ListView):
+class CategoryListView(
+    SplitRenderingMixin, ConditionalGetMixin, RegistryPostsMixin, ListView
+):
     model = Post
     template_name = 'blog/category.html'
     paginate_by = 10
 
-    def get_queryset(self):
+    def get_visible_posts(self):
         category_slug = self.kwargs['category_slug']
-        self.category = get_object_or_404(
-            Category, slug=category_slug, is_published=True
-        )
+        self.category = registry.category_by_slug(category_slug)
+        if self.category is None or not self.category.is_published:
+            raise Http404
         qs = super().get_queryset()
-        queryset = qs.filter(category=self.category)
-        queryset = filter_published_posts(queryset).select_related('author', 'category')
+        return filter_published_posts(qs.filter(category=self.category))
+
+    def get_validators(self):
+        return feed_state(self.get_visible_posts())
+
+    def get_queryset(self):
+        queryset = self.get_visible_posts().select_related('author')
         queryset = annotate_pub_coms(queryset)
         return order_date(queryset)
 
@@ -164,7 +216,11 @@ class CommentUpdateView(LoginRequiredMixin, UpdateView):
         post_id = self.kwargs['post_id']
         comment_id = self.kwargs['comment_id']
         comment = get_object_or_404(
-            Comment, pk=comment_id, post_id=post_id, author=self.request.user
+            Comment,
+            pk=comment_id,
+            post_id=post_id,
+            author=self.request.user,
+            deleted_on=None,
         )
         return comment
 
@@ -181,7 +237,9 @@ class CommentCreateView(LoginRequiredMixin, CreateView):
 
     def form_valid(self, form):
         form.instance.author = self.request.user
-        form.instance.post = get_object_or_404(Post, pk=self.kwargs['post_id'])
+        form.instance.post = get_object_or_404(
+            Post, pk=self.kwargs['post_id'], deleted_on=None
+        )
         return super().form_valid(form)
 
     def get_success_url(self):
@@ -198,47 +256,110 @@ class CommentDeleteView(LoginRequiredMixin, DeleteView):
         comment_id = self.kwargs['comment_id']
         post_id = self.kwargs['post_id']
         return get_object_or_404(
-            Comment, pk=comment_id, post_id=post_id, author=self.request.user
+            Comment,
+            pk=comment_id,
+            post_id=post_id,
+            author=self.request.user,
+            deleted_on=None,
         )
 
+    def delete(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        success_url = self.get_success_url()
+        delete_comment(self.object)
+        return redirect(success_url)
+
     def get_success_url(self):
         return reverse(
             'blog:post_detail', kwargs={'post_id': self.kwargs['post_id']}
         )
 
 
-class PostDetailView(DetailView):
+class PostDetailView(SplitRenderingMixin, ConditionalGetMixin, DetailView):
     model = Post
     template_name = 'blog/detail.html'
     pk_url_kwarg = 'post_id'
 
-    def get_queryset(self):
-        base_qst = Post.objects.select_related('author', 'category')
-
-        if self.request.user.is_authenticated:
-            return base_qst.filter(
-                models.Q(
-                    is_published=True,
-                    pub_date__lte=timezone.now(),
-                    category__is_published=True
-                )
-                | models.Q(author=self.request.user)
-            )
-        else:
-            return filter_published_posts(base_qst)
+    def get_validators(self):
+        self.object = self.get_object()
+        return (self.object.updated_at,)
+
+    def get_object(self, queryset=None):
+        if getattr(self, 'object', None) is not None:
+            return self.object
+        post = get_object_or_404(
+            Post.objects.select_related('author', 'category'),
+            pk=self.kwargs[self.pk_url_kwarg],
+        )
+        if is_post_published(post):
+            return post
+        self.public = False
+        user = self.request.user
+        if (
+            post.deleted_on is None
+            and user.is_authenticated
+            and post.author_id == user.id
+        ):
+            return post
+        raise Http404
+
+    def get_fragments_url(self):
+        return f'{super().get_fragments_url()}?post={self.object.pk}'
 
     def get_context_data(self, **kwargs):
         post = self.object
         context = super().get_context_data(**kwargs)
 
         context['comments'] = (
-            post.comments.filter(is_published=True).select_related('author')
+            exclude_deleted(post.comments.filter(is_published=True))
+            .select_related('author')
             .order_by('created_at')
         )
 
-        if self.request.user.is_authenticated:
+        if self.get_user().is_authenticated:
             context['form'] = CommentForm()
         else:
             context['form'] = None
 
-        return context
\ No newline at end of file
+        return context
+
+
+class UserFragmentsView(View):
+    def get(self, request, *args, **kwargs):
+        post_id = request.GET.get('post', '')
+        post = None
+        if post_id.isdigit():
+            post = Post.objects.select_related('author').filter(
+                pk=post_id, deleted_on=None
+            ).first()
+        response = JsonResponse(user_fragments(request, post))
+        add_never_cache_headers(response)
+        return response
+
+
+class AutocompleteView(LoginRequiredMixin, View):
+    model = None
+    search_field = None
+    limit = 20
+
+    def get(self, request, *args, **kwargs):
+        term = request.GET.get('q', '').strip()
+        queryset = self.model.objects.filter(is_published=True)
+        if term:
+            queryset = queryset.filter(prefix_search(term))
+        rows = queryset.order_by(self.search_field).values_list(
+            'pk', self.search_field
+        )[:self.limit]
+        return JsonResponse(
+            {'results': [{'id': pk, 'text': text} for pk, text in rows]}
+        )
+
+
+class CategoryAutocompleteView(AutocompleteView):
+    model = Category
+    search_field = 'title'
+
+
+class LocationAutocompleteView(AutocompleteView):
+    model = Location
+    search_field = 'name'
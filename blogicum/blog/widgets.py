@@ -0,0 +1,46 @@
+from django import forms
+from django.urls import reverse
+
+
+class AutocompleteSelect(forms.Select):
+    """Select that renders only the chosen option.
+
+    The remaining options are fetched from a JSON endpoint as the user
+    types, so the page does not load the whole table.
+    """
+
+    class Media:
+        js = ('js/autocomplete.js',)
+
+    def __init__(self, url_name, attrs=None):
+        super().__init__(attrs)
+        self.url_name = url_name
+
+    def __deepcopy__(self, memo):
+        obj = super().__deepcopy__(memo)
+        obj.url_name = self.url_name
+        return obj
+
+    def get_context(self, name, value, attrs):
+        attrs = {
+            **(attrs or {}),
+            'data-autocomplete-url': reverse(self.url_name),
+        }
+        return super().get_context(name, value, attrs)
+
+    def optgroups(self, name, value, attrs=None):
+        iterator = self.choices
+        selected = [v for v in value if v not in ('', None)]
+        choices = []
+        if iterator.field.empty_label is not None:
+            choices.append(('', iterator.field.empty_label))
+        if selected:
+            choices.extend(
+                iterator.choice(obj)
+                for obj in iterator.queryset.filter(pk__in=selected)
+            )
+        self.choices = choices
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = iterator
@@ -32,26 +32,39 @@ ALLOWED_HOSTS = [
     '127.0.0.1',
 ]
 
+INTERNAL_IPS = [
+    '127.0.0.1',
+]
+
 # Application definition
 
 INSTALLED_APPS = [
     'blog.apps.BlogConfig',
     'pages.apps.PagesConfig',
-    'django.contrib.admin',
+    'monitoring.apps.MonitoringConfig',
+    'django.contrib.admin.apps.SimpleAdminConfig',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.forms',
     'django_bootstrap5',
 ]
 
 MIDDLEWARE = [
+    'monitoring.profiler.ProfilerMiddleware',
+    'monitoring.tracing.TracingMiddleware',
+    'monitoring.middleware.MetricsMiddleware',
+    'monitoring.memory.MemoryMiddleware',
+    'monitoring.querylog.QueryLogMiddleware',
+    'monitoring.nplusone.NPlusOneMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'blog.split.SplitRenderingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -64,8 +77,14 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'blogicum.template_bundle.Loader',
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -76,6 +95,10 @@ TEMPLATES = [
     },
 ]
 
+TEMPLATE_BUNDLE_PATH = BASE_DIR / 'templates.bundle'
+
+FORM_RENDERER = 'django.forms.renderers.TemplatesSetting'
+
 WSGI_APPLICATION = 'blogicum.wsgi.application'
 
 
@@ -89,6 +112,13 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -137,12 +167,89 @@ STATICFILES_DIRS = [
     BASE_DIR / 'static_dev',
 ]
 
+MEDIA_URL = '/media/'
+
 MEDIA_ROOT = BASE_DIR / 'media'
 
+POST_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+
+POST_IMAGE_MAX_PIXELS = 40_000_000
+
+MEDIA_ACCEL = None
+
+MEDIA_PUBLIC_MAX_AGE = 60
+
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
 
 LOGIN_REDIRECT_URL = 'blog:index'
 
-LOGIN_URL = 'login'
\ No newline at end of file
+LOGIN_URL = 'login'
+
+REFTABLES_PATH = BASE_DIR / 'reftables.bin'
+
+BLOG_SOFT_DELETE = False
+
+SPLIT_RENDERING = False
+
+SPLIT_RENDERING_MAX_AGE = 60
+
+METRICS_DIR = BASE_DIR / 'metrics'
+
+# Bearer token of the /metrics scraper; without it only staff may read.
+METRICS_TOKEN = None
+
+SLOW_QUERY_THRESHOLD = 0.1
+
+QUERY_SAMPLE_RATE = 0.01
+
+QUERY_LOG_PATH = BASE_DIR / 'logs' / 'queries.log'
+
+NPLUSONE = 'log' if DEBUG else None
+
+NPLUSONE_THRESHOLD = 3
+
+MEMORY_PROFILING = False
+
+MEMORY_SAMPLE_RATE = 0.05
+
+MEMORY_TOP_SITES = 5
+
+MEMORY_RSS_LIMIT = None
+
+TRACING = False
+
+TRACE_SAMPLE_RATE = 1.0
+
+TRACE_FILE = BASE_DIR / 'traces' / 'spans.jsonl'
+
+PROFILE_DIR = BASE_DIR / 'profiles'
+
+PROFILER_SAMPLE_INTERVAL = 0.001
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'queries': {
+            'class': 'monitoring.querylog.QueryLogHandler',
+            'filename': QUERY_LOG_PATH,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        'monitoring.queries': {
+            'handlers': ['queries'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
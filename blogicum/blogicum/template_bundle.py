@@ -0,0 +1,124 @@
+"""Template sources packed into one file at deploy time.
+
+``manage.py compile_templates`` checks that every template compiles and
+writes the sources found by the filesystem and app directories loaders to
+``TEMPLATE_BUNDLE_PATH``.  ``Loader`` serves templates from that file, read
+once per process, so looking a template up costs one ``stat`` of its file
+instead of a search through every template directory and an ``open``.
+It sits inside the cached loader, which keeps every compiled template for
+the life of the process; ``serve`` compiles them all in the master before
+forking.  Templates missing from the bundle, and templates whose file has
+changed since it was built (modification time or size), fall through to
+the regular loaders, so edits on disk are picked up without rebuilding.
+"""
+import json
+import os
+
+from django.conf import settings
+from django.template import Origin, TemplateDoesNotExist
+from django.template.loaders.base import Loader as BaseLoader
+from django.template.loaders.cached import Loader as CachedLoader
+
+VERSION = 2
+TEMPLATE_EXTENSIONS = ('.html', '.txt')
+
+
+def source_loaders(engine):
+    """The loaders that read templates from disk, in lookup order."""
+    loaders = []
+    for loader in engine.template_loaders:
+        if isinstance(loader, CachedLoader):
+            loaders.extend(loader.loaders)
+        else:
+            loaders.append(loader)
+    return [
+        loader for loader in loaders
+        if hasattr(loader, 'get_dirs') and not isinstance(loader, Loader)
+    ]
+
+
+def collect(engine):
+    """{name: (path, source)} of every template the engine can find."""
+    templates = {}
+    for loader in source_loaders(engine):
+        for directory in loader.get_dirs():
+            directory = str(directory)
+            for root, _, files in os.walk(directory):
+                for filename in sorted(files):
+                    if not filename.endswith(TEMPLATE_EXTENSIONS):
+                        continue
+                    path = os.path.join(root, filename)
+                    name = os.path.relpath(path, directory).replace(
+                        os.sep, '/'
+                    )
+                    if name in templates:
+                        continue
+                    with open(path, encoding=engine.file_charset) as source:
+                        templates[name] = (path, source.read())
+    return templates
+
+
+def file_state(path):
+    """(modification time, size) of the file, None if it is gone."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def build(path, templates):
+    bundle = {
+        'version': VERSION,
+        'templates': {
+            name: {
+                'origin': origin,
+                'source': source,
+                'state': file_state(origin),
+            }
+            for name, (origin, source) in templates.items()
+        },
+    }
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as output:
+        json.dump(bundle, output, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class Loader(BaseLoader):
+    def __init__(self, engine, path=None):
+        super().__init__(engine)
+        self.path = path
+        self._templates = None
+
+    @property
+    def templates(self):
+        if self._templates is None:
+            path = self.path or settings.TEMPLATE_BUNDLE_PATH
+            try:
+                with open(path, encoding='utf-8') as bundle:
+                    data = json.load(bundle)
+            except (OSError, TypeError, ValueError):
+                data = {}
+            if data.get('version') != VERSION:
+                data = {}
+            self._templates = data.get('templates', {})
+        return self._templates
+
+    def get_template_sources(self, template_name):
+        template = self.templates.get(template_name)
+        if (
+            template is not None
+            and file_state(template['origin']) == template['state']
+        ):
+            yield Origin(
+                name=template['origin'],
+                template_name=template_name,
+                loader=self,
+            )
+
+    def get_contents(self, origin):
+        try:
+            return self.templates[origin.template_name]['source']
+        except KeyError:
+            raise TemplateDoesNotExist(origin)
@@ -18,9 +18,15 @@ from django.contrib import admin
 from django.views.generic.edit import CreateView
 from django.conf import settings
 from django.contrib.auth.forms import UserCreationForm
-from django.conf.urls.static import static
 from django.urls import include, path, reverse_lazy
 
+from blog.images import serve_image_variant
+from blog.media import serve_post_image
+
+# Admin modules are loaded with the URLconf rather than at django.setup(),
+# so management commands that never route a request do not import them.
+admin.autodiscover()
+
 
 urlpatterns = [
     path('', include('blog.urls', namespace='blog')),
@@ -36,6 +42,7 @@ urlpatterns = [
         name='registration',
     ),
     path('auth/', include('django.contrib.auth.urls')),
+    path('metrics', include('monitoring.urls', namespace='monitoring')),
 ]
 
 handler404 = 'pages.views.page_not_found'
@@ -44,4 +51,16 @@ CSRF_FAILURE_VIEW = 'pages.views.csrf_failure'
 
 handler500 = 'pages.views.handler500'
 
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+urlpatterns += [
+    path(
+        settings.MEDIA_URL.lstrip('/')
+        + 'variants/<int:width>/<path:path>',
+        serve_image_variant,
+        name='image_variant',
+    ),
+    path(
+        settings.MEDIA_URL.lstrip('/') + '<path:path>',
+        serve_post_image,
+        name='media',
+    ),
+]
@@ -0,0 +1,93 @@
+"""Work done once in the master process before workers are forked.
+
+Everything loaded here is inherited by the workers.  ``freeze()`` moves
+it to the permanent GC generation, so the collector of a worker never
+touches (and therefore never copies) those pages.
+"""
+import gc
+import os
+import time
+
+from django.db import connections
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+from django.urls import URLResolver, get_resolver
+
+from .template_bundle import collect
+
+
+def compile_templates():
+    """Compile every template the Django engines can find.
+
+    Compiled templates stay in memory only with the cached template
+    loader.
+    """
+    compiled = 0
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates):
+            continue
+        for name in sorted(collect(engine.engine)):
+            engine.get_template(name)
+            compiled += 1
+    return compiled
+
+
+def resolve_urls(resolver=None):
+    """Populate the reverse maps of every resolver."""
+    resolver = resolver or get_resolver()
+    resolver.reverse_dict
+    count = 0
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            count += resolve_urls(pattern)
+        else:
+            count += 1
+    return count
+
+
+def database_exists(connection):
+    """False for an SQLite file that does not exist yet.
+
+    Connecting to it would silently create an empty database.
+    """
+    if connection.vendor != 'sqlite' or connection.is_in_memory_db():
+        return True
+    return os.path.exists(connection.settings_dict['NAME'])
+
+
+def check_databases():
+    """Connect to every database once, then close before forking.
+
+    A connection opened in the master would be shared by all workers, so
+    this only loads the backend modules and fails early on bad settings.
+    Returns the number of databases checked.
+    """
+    checked = 0
+    for connection in connections.all():
+        if not database_exists(connection):
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        checked += 1
+    connections.close_all()
+    return checked
+
+
+def freeze():
+    gc.collect()
+    gc.freeze()
+    return gc.get_freeze_count()
+
+
+def warm_up():
+    """Run every step; return {step: (result, seconds)}."""
+    steps = {}
+    for name, step in (
+        ('templates', compile_templates),
+        ('urls', resolve_urls),
+        ('databases', check_databases),
+        ('gc_freeze', freeze),
+    ):
+        start = time.perf_counter()
+        steps[name] = (step(), time.perf_counter() - start)
+    return steps
@@ -0,0 +1,29 @@
+"""Production server settings: ``gunicorn -c gunicorn.conf.py``.
+
+The application is imported once in the master (``preload_app``) and
+warmed up there (templates, URLs, database check, see
+``blogicum.warmup``).  Right before each fork the master moves everything
+it holds to the permanent GC generation, so workers share those pages
+copy-on-write instead of copying them on their first collection.
+"""
+import gc
+import os
+
+wsgi_app = 'blogicum.wsgi:application'
+chdir = os.path.dirname(os.path.abspath(__file__))
+bind = os.environ.get('GUNICORN_BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', os.cpu_count() or 1))
+preload_app = True
+
+
+def on_starting(server):
+    from blogicum.warmup import warm_up
+
+    for name, (result, duration) in warm_up().items():
+        server.log.info(
+            'warm-up %s: %s in %.1f ms', name, result, duration * 1000
+        )
+
+
+def pre_fork(server, worker):
+    gc.freeze()
@@ -0,0 +1,18 @@
+from django.apps import AppConfig
+
+
+class MonitoringConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'monitoring'
+    verbose_name = 'Мониторинг'
+
+    def ready(self):
+        from django.conf import settings
+
+        from . import rendering
+
+        rendering.install()
+        if settings.TRACING:
+            from . import tracing
+
+            tracing.install()
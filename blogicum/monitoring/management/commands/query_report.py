@@ -0,0 +1,80 @@
+import glob
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        'Сводка журнала запросов: самые тяжёлые запросы по отпечатку SQL '
+        'с суммарным и максимальным временем и примером плана.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10)
+        parser.add_argument(
+            '--path', default=None,
+            help='Журнал (по умолчанию QUERY_LOG_PATH и его ротации).',
+        )
+        parser.add_argument(
+            '--slow-only', action='store_true',
+            help='Учитывать только медленные запросы.',
+        )
+
+    def read_records(self, path):
+        for filename in sorted(glob.glob(f'{path}*')):
+            with open(filename, encoding='utf-8') as log:
+                for line in log:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+
+    def handle(self, *args, **options):
+        path = options['path'] or str(settings.QUERY_LOG_PATH)
+        stats = {}
+        for record in self.read_records(path):
+            if options['slow_only'] and not record.get('slow'):
+                continue
+            entry = stats.setdefault(record['fingerprint'], {
+                'count': 0, 'slow': 0, 'total': 0.0, 'max': 0.0,
+                'views': set(), 'example': None,
+            })
+            entry['count'] += 1
+            entry['total'] += record['duration']
+            entry['max'] = max(entry['max'], record['duration'])
+            entry['views'].add(record.get('view') or '-')
+            if record.get('slow'):
+                entry['slow'] += 1
+                if entry['example'] is None or (
+                    record['duration'] >= entry['max']
+                ):
+                    entry['example'] = record
+
+        top = sorted(
+            stats.items(), key=lambda item: item[1]['total'], reverse=True
+        )[:options['top']]
+        if not top:
+            self.stdout.write('Журнал запросов пуст.')
+            return
+        for rank, (sql, entry) in enumerate(top, start=1):
+            mean = entry['total'] / entry['count']
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{rank}. всего {entry["total"] * 1000:.1f} мс, '
+                f'записей {entry["count"]} (медленных {entry["slow"]}), '
+                f'среднее {mean * 1000:.1f} мс, '
+                f'максимум {entry["max"] * 1000:.1f} мс'
+            ))
+            self.stdout.write(f'   {sql}')
+            self.stdout.write(
+                f'   представления: {", ".join(sorted(entry["views"]))}'
+            )
+            example = entry['example']
+            if example:
+                self.stdout.write(
+                    f'   источник: {example.get("origin")}, '
+                    f'шаблон: {example.get("template")}'
+                )
+                for row in example.get('plan') or ():
+                    self.stdout.write(f'     {row}')
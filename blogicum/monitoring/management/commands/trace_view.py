@@ -0,0 +1,100 @@
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+BAR_WIDTH = 40
+
+
+class Command(BaseCommand):
+    help = (
+        'Просмотр трассировок из TRACE_FILE: список последних запросов '
+        'или дерево спанов одной трассировки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'trace_id', nargs='?',
+            help='Идентификатор (или его начало) трассировки; "last" — '
+                 'последняя.',
+        )
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--path', default=None)
+        parser.add_argument(
+            '--min-ms', type=float, default=0,
+            help='Не показывать спаны короче указанного времени.',
+        )
+
+    def read_traces(self, path):
+        traces = {}
+        try:
+            with open(path, encoding='utf-8') as spans:
+                for line in spans:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    traces.setdefault(record['trace_id'], []).append(record)
+        except FileNotFoundError:
+            raise CommandError(f'Файл трассировок {path} не найден.')
+        return traces
+
+    def handle(self, *args, **options):
+        traces = self.read_traces(options['path'] or str(settings.TRACE_FILE))
+        if not options['trace_id']:
+            self.list_traces(traces, options['limit'])
+            return
+        if options['trace_id'] == 'last':
+            trace_ids = list(traces)[-1:]
+        else:
+            trace_ids = [
+                trace_id for trace_id in traces
+                if trace_id.startswith(options['trace_id'])
+            ]
+        if len(trace_ids) != 1:
+            raise CommandError('Трассировка не найдена или не уникальна.')
+        self.show_tree(traces[trace_ids[0]], options['min_ms'] / 1000)
+
+    def list_traces(self, traces, limit):
+        for trace_id, spans in list(traces.items())[-limit:]:
+            root = next(
+                (span for span in spans if span['parent_id'] is None),
+                spans[0],
+            )
+            started = datetime.fromtimestamp(root['start'])
+            self.stdout.write(
+                f'{trace_id[:12]}  {started:%Y-%m-%d %H:%M:%S}  '
+                f'{root["duration"] * 1000:8.1f} мс  '
+                f'спанов {len(spans):4}  {root["name"]}'
+            )
+
+    def show_tree(self, spans, min_duration):
+        children = {}
+        for span in spans:
+            children.setdefault(span['parent_id'], []).append(span)
+        roots = children.get(None, [])
+        if not roots:
+            return
+        origin = roots[0]['start']
+        total = roots[0]['duration'] or 1
+
+        def show(span, depth):
+            if span['duration'] < min_duration:
+                return
+            offset = int((span['start'] - origin) / total * BAR_WIDTH)
+            width = max(1, int(span['duration'] / total * BAR_WIDTH))
+            bar = (' ' * offset + '█' * width)[:BAR_WIDTH].ljust(BAR_WIDTH)
+            detail = span['attributes'].get('sql', '')
+            self.stdout.write(
+                f'{bar} {span["duration"] * 1000:8.2f} мс  '
+                f'{"  " * depth}[{span["kind"]}] {span["name"]} '
+                f'{detail[:80]}'.rstrip()
+            )
+            for child in sorted(
+                children.get(span['span_id'], []), key=lambda s: s['start']
+            ):
+                show(child, depth + 1)
+
+        for root in roots:
+            show(root, 0)
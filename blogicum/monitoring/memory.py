@@ -0,0 +1,147 @@
+"""Per-request memory high-water marks.
+
+Enabled with ``MEMORY_PROFILING``.  A ``MEMORY_SAMPLE_RATE`` fraction of
+requests runs under tracemalloc: the peak of traced memory and the lines
+that allocated the most during the request are exported per route.  As
+tracemalloc is process-wide, only one request per process is sampled at a
+time, and its numbers include what other threads allocated meanwhile.
+
+Every request also updates the worker RSS gauge.  Above
+``MEMORY_RSS_LIMIT`` bytes the worker sends itself SIGTERM once, which
+gunicorn and uWSGI treat as a graceful shutdown: the current requests are
+finished and the master starts a fresh worker.
+"""
+import logging
+import os
+import random
+import resource
+import signal
+import threading
+import tracemalloc
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .metrics import registry
+from .middleware import route_name
+
+logger = logging.getLogger('monitoring.memory')
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+def current_rss():
+    """Resident set size of this process in bytes."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        # Peak rather than current RSS, but never lower than it.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def process_memory(pid='self'):
+    """RSS, PSS, unique and shared bytes of a process (Linux only)."""
+    fields = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as rollup:
+            for line in rollup:
+                key, _, value = line.partition(':')
+                parts = value.split()
+                if len(parts) == 2 and parts[1] == 'kB':
+                    fields[key] = int(parts[0]) * 1024
+    except OSError:
+        return None
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'uss': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+        'shared': fields.get('Shared_Clean', 0)
+        + fields.get('Shared_Dirty', 0),
+    }
+
+
+def site_name(frame):
+    filename = frame.filename
+    base_dir = str(settings.BASE_DIR) + os.sep
+    if filename.startswith(base_dir):
+        filename = filename[len(base_dir):]
+    elif 'site-packages' + os.sep in filename:
+        filename = filename.split('site-packages' + os.sep, 1)[1]
+    return f'{filename}:{frame.lineno}'
+
+
+class MemoryMiddleware:
+    _sampling = threading.Lock()
+    recycling = False
+
+    def __init__(self, get_response):
+        if not settings.MEMORY_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (
+            random.random() < settings.MEMORY_SAMPLE_RATE
+            and self._sampling.acquire(blocking=False)
+        ):
+            try:
+                response = self.traced(request)
+            finally:
+                self._sampling.release()
+        else:
+            response = self.get_response(request)
+        self.check_rss()
+        return response
+
+    def traced(self, request):
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+        base, _ = tracemalloc.get_traced_memory()
+        try:
+            response = self.get_response(request)
+            _, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+        finally:
+            if started:
+                tracemalloc.stop()
+
+        route = route_name(request)
+        registry.observe(
+            'blogicum_request_memory_peak_bytes', {'view': route},
+            peak - base,
+        )
+        top = after.compare_to(before, 'lineno')[:settings.MEMORY_TOP_SITES]
+        for stat in top:
+            if stat.size_diff <= 0:
+                continue
+            registry.inc(
+                'blogicum_request_allocated_bytes_total',
+                {'view': route, 'site': site_name(stat.traceback[0])},
+                stat.size_diff,
+            )
+        return response
+
+    def check_rss(self):
+        rss = current_rss()
+        registry.set('blogicum_process_rss_bytes', value=rss)
+        limit = settings.MEMORY_RSS_LIMIT
+        if not limit or rss <= limit or MemoryMiddleware.recycling:
+            return
+        MemoryMiddleware.recycling = True
+        registry.inc('blogicum_worker_recycles_total')
+        registry.flush(force=True)
+        logger.warning(
+            'RSS процесса %s: %s байт при лимите %s, перезапуск.',
+            os.getpid(), rss, limit,
+        )
+        os.kill(os.getpid(), signal.SIGTERM)
@@ -0,0 +1,366 @@
+"""Process-local metrics merged across workers through a shared directory.
+
+Every process keeps its counters, histograms and gauges in memory and
+dumps them to ``METRICS_DIR/<pid>-<start time>.json`` at most once per
+``FLUSH_INTERVAL`` (and at exit).  The ``/metrics`` view merges all dumps
+into the Prometheus text exposition format, so numbers from every WSGI
+worker are reported no matter which worker answers the scrape.
+
+The start time keeps a new process that got a recycled pid from
+overwriting the dump of the dead one.  Dumps of finished processes are
+folded into ``aggregate.json`` during collection, so their counters keep
+counting while the directory stays the size of the live worker set.
+"""
+import atexit
+import fcntl
+import json
+import math
+import os
+import threading
+import time
+
+from django.conf import settings
+
+FLUSH_INTERVAL = 1.0
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+COUNTER, GAUGE, HISTOGRAM = 'counter', 'gauge', 'histogram'
+AGGREGATE = 'aggregate.json'
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._descriptions = {}
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._flushed_at = 0.0
+        self._pid = None
+        self._start = None
+
+    def describe(self, name, kind, help_text, buckets=DEFAULT_BUCKETS):
+        self._descriptions[name] = (kind, help_text, tuple(buckets))
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((labels or {}).items()))
+
+    def inc(self, name, labels=None, value=1):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, labels=None, value=0):
+        labels = {**(labels or {}), 'pid': str(os.getpid())}
+        with self._lock:
+            self._gauges[self._key(name, labels)] = value
+
+    def observe(self, name, labels=None, value=0.0):
+        buckets = self._descriptions.get(
+            name, (HISTOGRAM, '', DEFAULT_BUCKETS)
+        )[2]
+        key = self._key(name, labels)
+        with self._lock:
+            counts, total = self._histograms.get(
+                key, ([0] * len(buckets), [0.0, 0])
+            )
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    counts[index] += 1
+            total[0] += value
+            total[1] += 1
+            self._histograms[key] = (counts, total)
+
+    def identity(self):
+        """(pid, start time) of this process; re-read after a fork."""
+        pid = os.getpid()
+        if pid != self._pid:
+            self._pid = pid
+            self._start = process_start(pid) or time.time_ns()
+        return self._pid, self._start
+
+    def snapshot(self):
+        pid, start = self.identity()
+        with self._lock:
+            return {
+                'pid': pid,
+                'start': start,
+                'counters': [
+                    [name, labels, value]
+                    for (name, labels), value in self._counters.items()
+                ],
+                'gauges': [
+                    [name, labels, value]
+                    for (name, labels), value in self._gauges.items()
+                ],
+                'histograms': [
+                    [name, labels, list(counts), total[0], total[1]]
+                    for (name, labels), (counts, total)
+                    in self._histograms.items()
+                ],
+            }
+
+    def flush(self, force=False):
+        directory = settings.METRICS_DIR
+        if not directory:
+            return
+        now = time.monotonic()
+        if not force and now - self._flushed_at < FLUSH_INTERVAL:
+            return
+        self._flushed_at = now
+        os.makedirs(directory, exist_ok=True)
+        snapshot = self.snapshot()
+        _write(
+            os.path.join(
+                directory, f'{snapshot["pid"]}-{snapshot["start"]}.json'
+            ),
+            snapshot,
+        )
+
+    def collect(self):
+        """Merge dumps of all processes with the live state of this one."""
+        self.flush(force=True)
+        directory = settings.METRICS_DIR
+        if not directory or not os.path.isdir(directory):
+            return merge([self.snapshot()])
+        with open(os.path.join(directory, '.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                return merge(compact(directory))
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def render(self):
+        return render(self.collect(), self._descriptions)
+
+
+def process_start(pid):
+    """Start time of ``pid`` in clock ticks since boot, None if unknown."""
+    try:
+        with open(f'/proc/{pid}/stat') as stat:
+            return int(stat.read().rsplit(')', 1)[1].split()[19])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _alive(pid, start=None):
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    if start is not None:
+        current = process_start(pid)
+        if current is not None and current != start:
+            # The pid now belongs to another process.
+            return False
+    return True
+
+
+def _read(path):
+    try:
+        with open(path) as dump:
+            return json.load(dump)
+    except (OSError, ValueError):
+        return None
+
+
+def _write(path, data):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as dump:
+        json.dump(data, dump)
+    os.replace(tmp_path, path)
+
+
+def compact(directory):
+    """Fold dumps of finished processes into the aggregate.
+
+    Returns the aggregate and the dumps of live processes.  The aggregate
+    lists the dumps it already contains, so a dump whose removal was
+    interrupted is not counted twice.  Call with the directory locked.
+    """
+    aggregate_path = os.path.join(directory, AGGREGATE)
+    aggregate = _read(aggregate_path) or {
+        'counters': [], 'gauges': [], 'histograms': [], 'folded': [],
+    }
+    already_folded = set(aggregate.get('folded', []))
+    live, finished, folded = [], [], []
+    for entry in os.scandir(directory):
+        if not entry.name.endswith('.json') or entry.name == AGGREGATE:
+            continue
+        if entry.name in already_folded:
+            folded.append(entry.name)
+            continue
+        snapshot = _read(entry.path)
+        if snapshot is None:
+            continue
+        if _alive(snapshot.get('pid'), snapshot.get('start')):
+            live.append(snapshot)
+        else:
+            # Counters of a finished worker still count; its gauges
+            # describe a process that no longer exists.
+            snapshot['gauges'] = []
+            finished.append(snapshot)
+            folded.append(entry.name)
+    if finished:
+        counters, _, histograms = merge([aggregate, *finished])
+        aggregate = {
+            'counters': [
+                [name, list(labels), value]
+                for (name, labels), value in counters.items()
+            ],
+            'gauges': [],
+            'histograms': [
+                [name, list(labels), counts, total, count]
+                for (name, labels), (counts, total, count)
+                in histograms.items()
+            ],
+            'folded': folded,
+        }
+        _write(aggregate_path, aggregate)
+    for name in folded:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+    return [aggregate, *live]
+
+
+def _labels_key(labels):
+    return tuple(tuple(pair) for pair in labels)
+
+
+def merge(snapshots):
+    counters, gauges, histograms = {}, {}, {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, _labels_key(labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, value in snapshot['gauges']:
+            gauges[(name, _labels_key(labels))] = value
+        for name, labels, counts, total, count in snapshot['histograms']:
+            key = (name, _labels_key(labels))
+            merged = histograms.setdefault(key, [[0] * len(counts), 0.0, 0])
+            merged[0] = [a + b for a, b in zip(merged[0], counts)]
+            merged[1] += total
+            merged[2] += count
+    return counters, gauges, histograms
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    body = ','.join(
+        '{}="{}"'.format(
+            key,
+            str(value).replace('\\', r'\\').replace('"', r'\"')
+            .replace('\n', r'\n'),
+        )
+        for key, value in pairs
+    )
+    return '{' + body + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float) and math.isinf(value):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(collected, descriptions):
+    counters, gauges, histograms = collected
+    lines = []
+    by_name = {}
+    for (name, labels), value in counters.items():
+        by_name.setdefault((name, COUNTER), []).append((labels, value))
+    for (name, labels), value in gauges.items():
+        by_name.setdefault((name, GAUGE), []).append((labels, value))
+    for (name, labels), value in histograms.items():
+        by_name.setdefault((name, HISTOGRAM), []).append((labels, value))
+
+    for (name, kind), samples in sorted(by_name.items()):
+        help_text = descriptions.get(name, (kind, '', ()))[1]
+        if help_text:
+            lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in sorted(samples):
+            if kind != HISTOGRAM:
+                lines.append(
+                    f'{name}{_format_labels(labels)} {_format_value(value)}'
+                )
+                continue
+            counts, total, count = value
+            buckets = descriptions.get(
+                name, (kind, '', DEFAULT_BUCKETS)
+            )[2]
+            for bound, bucket_count in zip(buckets, counts):
+                lines.append(
+                    f'{name}_bucket'
+                    f'{_format_labels(labels, [("le", bound)])} '
+                    f'{bucket_count}'
+                )
+            lines.append(
+                f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} '
+                f'{count}'
+            )
+            lines.append(
+                f'{name}_sum{_format_labels(labels)} {_format_value(total)}'
+            )
+            lines.append(f'{name}_count{_format_labels(labels)} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+registry.describe(
+    'blogicum_http_requests_total', COUNTER, 'Обработанные HTTP-запросы.'
+)
+registry.describe(
+    'blogicum_http_request_duration_seconds', HISTOGRAM,
+    'Время обработки запроса.',
+)
+registry.describe(
+    'blogicum_db_queries_total', COUNTER, 'Запросы к базе данных.'
+)
+registry.describe(
+    'blogicum_db_query_duration_seconds', HISTOGRAM,
+    'Суммарное время запросов к базе данных за HTTP-запрос.',
+)
+atexit.register(registry.flush, force=True)
+registry.describe(
+    'blogicum_template_renders_total', COUNTER,
+    'Отрисовки шаблона, включая {% include %}.',
+)
+registry.describe(
+    'blogicum_template_render_seconds', HISTOGRAM,
+    'Собственное время отрисовки шаблона за HTTP-запрос '
+    '(без вложенных шаблонов).',
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+registry.describe(
+    'blogicum_template_queries_total', COUNTER,
+    'Запросы к базе данных, выполненные при отрисовке шаблона '
+    '(без вложенных шаблонов).',
+)
+registry.describe(
+    'blogicum_request_memory_peak_bytes', HISTOGRAM,
+    'Пик памяти, выделенной за HTTP-запрос (по выборке запросов).',
+    buckets=tuple(2 ** power * 1024 * 1024 for power in range(10)),
+)
+registry.describe(
+    'blogicum_request_allocated_bytes_total', COUNTER,
+    'Память, выделенная строками кода за HTTP-запрос (по выборке).',
+)
+registry.describe(
+    'blogicum_process_rss_bytes', GAUGE, 'Резидентная память процесса.'
+)
+registry.describe(
+    'blogicum_worker_recycles_total', COUNTER,
+    'Перезапуски процессов из-за превышения MEMORY_RSS_LIMIT.',
+)
@@ -0,0 +1,68 @@
+import time
+
+from django.db import connection
+
+from . import rendering
+from .metrics import registry
+
+
+class QueryCounter:
+    """connection.execute_wrapper that counts queries and their time."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match._func_path
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with connection.execute_wrapper(counter), \
+                rendering.collect(counter) as renders:
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        route = route_name(request)
+        labels = {'view': route, 'method': request.method}
+        registry.inc(
+            'blogicum_http_requests_total',
+            {**labels, 'status': str(response.status_code)},
+        )
+        registry.observe(
+            'blogicum_http_request_duration_seconds', labels, duration
+        )
+        registry.inc(
+            'blogicum_db_queries_total', {'view': route}, counter.count
+        )
+        registry.observe(
+            'blogicum_db_query_duration_seconds', {'view': route},
+            counter.duration,
+        )
+        for template, (calls, duration, queries) in renders.templates.items():
+            labels = {'view': route, 'template': template}
+            registry.inc('blogicum_template_renders_total', labels, calls)
+            registry.observe(
+                'blogicum_template_render_seconds', labels, duration
+            )
+            registry.inc('blogicum_template_queries_total', labels, queries)
+        registry.flush()
+        return response
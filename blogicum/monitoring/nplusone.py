@@ -0,0 +1,112 @@
+"""Detection of N+1 queries.
+
+Every SELECT is reduced to its fingerprint; when the same fingerprint is
+run with ``NPLUSONE_THRESHOLD`` different parameter sets inside one
+request (or one ``detect()`` block), the place that issued it is reported:
+the template tag being rendered and the project frame below it.  With
+``NPLUSONE = 'raise'`` the request fails with ``NPlusOneError`` instead
+of only logging a warning, which is how the test suite runs.
+"""
+import logging
+import sys
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+from .querylog import fingerprint, is_project_file
+
+logger = logging.getLogger('monitoring.nplusone')
+
+
+class NPlusOneError(AssertionError):
+    pass
+
+
+def template_line(frame):
+    """'name:line' of the template node that ``frame`` is rendering."""
+    while frame is not None:
+        if frame.f_code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            token = getattr(node, 'token', None)
+            origin = getattr(node, 'origin', None)
+            if token is not None and origin is not None:
+                name = origin.template_name or origin.name
+                return f'{name}:{token.lineno}'
+        frame = frame.f_back
+    return None
+
+
+def python_line(frame):
+    while frame is not None:
+        if is_project_file(frame.f_code.co_filename):
+            return f'{frame.f_code.co_filename}:{frame.f_lineno}'
+        frame = frame.f_back
+    return None
+
+
+class NPlusOneDetector:
+    """connection.execute_wrapper collecting repeated query shapes."""
+
+    def __init__(self, threshold=None):
+        self.threshold = threshold or settings.NPLUSONE_THRESHOLD
+        self.counts = {}
+        self.params = {}
+        self.problems = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip()[:6].upper() == 'SELECT':
+            self.record(sql, params)
+        return execute(sql, params, many, context)
+
+    def record(self, sql, params):
+        key = fingerprint(sql)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        seen = self.params.setdefault(key, set())
+        if len(seen) >= self.threshold:
+            return
+        seen.add(repr(params))
+        if len(seen) == self.threshold:
+            frame = sys._getframe(2)
+            self.problems.append({
+                'fingerprint': key,
+                'sql': sql,
+                'template': template_line(frame),
+                'origin': python_line(frame),
+            })
+
+    def report(self):
+        return [
+            f'N+1: {self.counts[problem["fingerprint"]]} однотипных запросов '
+            f'из шаблона {problem["template"] or "-"}, '
+            f'код {problem["origin"] or "-"}: {problem["sql"]}'
+            for problem in self.problems
+        ]
+
+
+@contextmanager
+def detect(mode=None, threshold=None):
+    """Watch queries inside the block; log or raise on N+1 patterns."""
+    mode = mode or settings.NPLUSONE
+    detector = NPlusOneDetector(threshold)
+    with connection.execute_wrapper(detector):
+        yield detector
+    lines = detector.report()
+    if not lines:
+        return
+    if mode == 'raise':
+        raise NPlusOneError('\n'.join(lines))
+    for line in lines:
+        logger.warning(line)
+
+
+class NPlusOneMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.NPLUSONE:
+            return self.get_response(request)
+        with detect():
+            response = self.get_response(request)
+        return response
@@ -0,0 +1,202 @@
+"""On-demand profiling of a single request for staff users.
+
+A staff user adds ``?_profile=1`` (or the ``X-Profile: 1`` header) to a
+request and gets back a report instead of the page; with the value
+``store`` the page is returned as usual and only the files are written.
+The request runs under cProfile while a sampler thread records its stack
+every ``PROFILER_SAMPLE_INTERVAL`` seconds.  Both results are written to
+``PROFILE_DIR``: ``.prof`` for pstats/snakeviz and ``.folded`` collapsed
+stacks for flamegraph.pl or speedscope.
+
+Requests without the trigger only pay for a dictionary lookup.
+"""
+import collections
+import io
+import os
+import sys
+import threading
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.http import HttpResponse
+
+from .middleware import route_name
+from .querylog import frame_template, is_project_file
+
+TRIGGER_PARAM = '_profile'
+TRIGGER_HEADER = 'HTTP_X_PROFILE'
+LAYERS = ('orm', 'templates', 'view', 'middleware', 'other')
+
+_DB_DIR = os.sep + os.path.join('django', 'db') + os.sep
+
+
+def frame_label(frame):
+    template_name = frame_template(frame)
+    if template_name is not None:
+        return f'template:{template_name}'
+    code = frame.f_code
+    filename = code.co_filename
+    base_dir = str(settings.BASE_DIR) + os.sep
+    if filename.startswith(base_dir):
+        filename = filename[len(base_dir):]
+    elif 'site-packages' + os.sep in filename:
+        filename = filename.split('site-packages' + os.sep, 1)[1]
+    return f'{filename}:{code.co_name}'
+
+
+def frame_layer(frame):
+    filename = frame.f_code.co_filename
+    if _DB_DIR in filename:
+        return 'orm'
+    if frame_template(frame) is not None:
+        return 'templates'
+    if is_project_file(filename):
+        return 'view'
+    if 'middleware' in filename:
+        return 'middleware'
+    return None
+
+
+class StackSampler(threading.Thread):
+    """Samples the stack of another thread below ``stop_code``."""
+
+    def __init__(self, thread_id, stop_code, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.stop_code = stop_code
+        self.interval = interval
+        self.samples = collections.Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[self.sample(frame)] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+    def sample(self, frame):
+        stack = []
+        layer = None
+        template_name = None
+        while frame is not None and frame.f_code is not self.stop_code:
+            stack.append(frame_label(frame))
+            if layer is None:
+                layer = frame_layer(frame)
+            if template_name is None:
+                template_name = frame_template(frame)
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack), layer or 'other', template_name
+
+
+def is_staff_request(request):
+    """Check the session user before SessionMiddleware has run."""
+    engine = import_module(settings.SESSION_ENGINE)
+    request.session = engine.SessionStore(
+        request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    )
+    try:
+        user = get_user(request)
+    finally:
+        del request.session
+    return user.is_active and user.is_staff
+
+
+def percentages(counter, total):
+    return [
+        f'  {name:<40} {count * 100 / total:5.1f}%'
+        for name, count in counter.most_common()
+    ]
+
+
+class ProfilerMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = request.GET.get(TRIGGER_PARAM) or request.META.get(
+            TRIGGER_HEADER
+        )
+        if not mode or not is_staff_request(request):
+            return self.get_response(request)
+        return self.profile(request, mode)
+
+    def profile(self, request, mode):
+        import cProfile
+
+        sampler = StackSampler(
+            threading.get_ident(), sys._getframe().f_code,
+            settings.PROFILER_SAMPLE_INTERVAL,
+        )
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        sampler.start()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+            if hasattr(response, 'render') and callable(response.render):
+                response = response.render()
+        finally:
+            profiler.disable()
+            sampler.stop()
+        duration = time.perf_counter() - start
+
+        path = self.store(request, profiler, sampler)
+        if mode == 'store':
+            response['X-Profile-Report'] = os.path.basename(path)
+            return response
+        return HttpResponse(
+            self.report(request, duration, profiler, sampler, path),
+            content_type='text/plain; charset=utf-8',
+        )
+
+    def store(self, request, profiler, sampler):
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        route = route_name(request).replace(':', '-')
+        path = os.path.join(
+            settings.PROFILE_DIR,
+            f'{time.strftime("%Y%m%d-%H%M%S")}-{route}-{os.getpid()}',
+        )
+        profiler.dump_stats(f'{path}.prof')
+        folded = collections.Counter()
+        for (stack, layer, _), count in sampler.samples.items():
+            folded[';'.join((layer,) + stack)] += count
+        with open(f'{path}.folded', 'w', encoding='utf-8') as output:
+            for stack, count in folded.items():
+                output.write(f'{stack} {count}\n')
+        return path
+
+    def report(self, request, duration, profiler, sampler, path):
+        import pstats
+
+        total = sum(sampler.samples.values()) or 1
+        layers = collections.Counter({layer: 0 for layer in LAYERS})
+        templates = collections.Counter()
+        for (_, layer, template_name), count in sampler.samples.items():
+            layers[layer] += count
+            if template_name is not None:
+                templates[template_name] += count
+        lines = [
+            f'Профиль {request.method} {request.path} '
+            f'({route_name(request)}): {duration * 1000:.1f} мс, '
+            f'выборок {sum(sampler.samples.values())}',
+            '',
+            'По слоям:',
+            *percentages(layers, total),
+            '',
+            'По шаблонам (включая запросы из шаблонов):',
+            *percentages(templates, total),
+            '',
+            f'Файлы: {path}.folded, {path}.prof',
+            '',
+        ]
+        stats_output = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stats_output)
+        stats.sort_stats('cumulative').print_stats(30)
+        return '\n'.join(lines) + stats_output.getvalue()
@@ -0,0 +1,152 @@
+"""Slow query log with EXPLAIN capture and sampling.
+
+Queries slower than ``SLOW_QUERY_THRESHOLD`` seconds are written to the
+``monitoring.queries`` logger together with the view, the template being
+rendered, the Python frame that issued them and their query plan.  A
+``QUERY_SAMPLE_RATE`` fraction of all other queries is written too, so
+``query_report`` can aggregate by fingerprint over representative data.
+"""
+import json
+import logging
+import logging.handlers
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger('monitoring.queries')
+
+_state = threading.local()
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+_SPACE_RE = re.compile(r'\s+')
+_THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def fingerprint(sql):
+    """SQL with literals and IN-lists collapsed, for grouping queries."""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _IN_LIST_RE.sub('(...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+def frame_template(frame):
+    """Name of the template when ``frame`` is a ``Template.render`` call."""
+    if frame.f_code.co_name != 'render':
+        return None
+    owner = frame.f_locals.get('self')
+    origin = getattr(owner, 'origin', None)
+    if origin is None or getattr(owner, 'nodelist', None) is None:
+        return None
+    return str(origin.template_name or origin.name)
+
+
+def is_project_file(filename):
+    """True for the project's own code, outside of this app."""
+    filename = os.path.abspath(filename)
+    return filename.startswith(str(settings.BASE_DIR)) and not (
+        filename.startswith(_THIS_DIR) or 'site-packages' in filename
+    )
+
+
+def origin_frames(skip=2):
+    """(template, 'file:line') of the code that issued a query."""
+    template_name = None
+    python_origin = None
+    frame = sys._getframe(skip)
+    while frame is not None:
+        code = frame.f_code
+        if template_name is None:
+            template_name = frame_template(frame)
+        if python_origin is None:
+            if is_project_file(code.co_filename):
+                python_origin = f'{code.co_filename}:{frame.f_lineno}'
+        if template_name is not None and python_origin is not None:
+            break
+        frame = frame.f_back
+    return template_name, python_origin
+
+
+def explain(conn, sql, params):
+    prefix = (
+        'EXPLAIN QUERY PLAN ' if conn.vendor == 'sqlite' else 'EXPLAIN '
+    )
+    _state.explaining = True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return [' '.join(map(str, row)) for row in cursor.fetchall()]
+    except Exception as error:
+        return [f'EXPLAIN failed: {error}']
+    finally:
+        _state.explaining = False
+
+
+class QueryLogger:
+    """connection.execute_wrapper writing slow and sampled queries."""
+
+    def __init__(self, view_name=None, conn=None):
+        self.view_name = view_name
+        self.connection = conn or connection
+        self.threshold = settings.SLOW_QUERY_THRESHOLD
+        self.sample_rate = settings.QUERY_SAMPLE_RATE
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(_state, 'explaining', False):
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            slow = duration >= self.threshold
+            if slow or random.random() < self.sample_rate:
+                self.log(sql, params, many, duration, slow)
+
+    def log(self, sql, params, many, duration, slow):
+        record = {
+            'ts': time.time(),
+            'slow': slow,
+            'duration': round(duration, 6),
+            'view': self.view_name,
+            'fingerprint': fingerprint(sql),
+        }
+        if slow:
+            record['template'], record['origin'] = origin_frames(skip=3)
+            record['sql'] = sql
+            if not many and sql.lstrip()[:6].upper() == 'SELECT':
+                record['plan'] = explain(self.connection, sql, params)
+        logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+
+class QueryLogMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        query_logger = QueryLogger()
+        with connection.execute_wrapper(query_logger):
+            return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # resolver_match is only known once URL resolution has run.
+        for wrapper in connection.execute_wrappers:
+            if isinstance(wrapper, QueryLogger):
+                wrapper.view_name = request.resolver_match.view_name
+
+
+class QueryLogHandler(logging.handlers.RotatingFileHandler):
+    """Rotating file handler that creates its directory on demand."""
+
+    def __init__(self, filename, **kwargs):
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        super().__init__(filename, delay=True, **kwargs)
@@ -0,0 +1,73 @@
+"""Render time and query count per template and ``{% include %}``.
+
+``install()`` wraps ``Template.render``, which every top-level template and
+every include goes through.  While ``MetricsMiddleware`` collects a
+request, each render records its own time and queries, excluding those of
+the templates it includes, so the numbers of a page add up instead of
+counting ``post_card.html`` once for itself and again inside
+``index.html``.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from django.template.base import Template
+
+_state = threading.local()
+
+
+class RenderCollector:
+    def __init__(self, query_counter):
+        self.query_counter = query_counter
+        self.templates = {}
+        self._stack = []
+
+    def enter(self):
+        self._stack.append(
+            [time.perf_counter(), self.query_counter.count, 0.0, 0]
+        )
+
+    def exit(self, name):
+        start, start_queries, child_time, child_queries = self._stack.pop()
+        duration = time.perf_counter() - start
+        queries = self.query_counter.count - start_queries
+        if self._stack:
+            self._stack[-1][2] += duration
+            self._stack[-1][3] += queries
+        calls, self_time, self_queries = self.templates.get(name, (0, 0.0, 0))
+        self.templates[name] = (
+            calls + 1,
+            self_time + duration - child_time,
+            self_queries + queries - child_queries,
+        )
+
+
+@contextmanager
+def collect(query_counter):
+    collector = RenderCollector(query_counter)
+    _state.collector = collector
+    try:
+        yield collector
+    finally:
+        _state.collector = None
+
+
+def install():
+    if getattr(Template.render, 'instrumented', False):
+        return
+    render = Template.render
+
+    def instrumented_render(self, context):
+        collector = getattr(_state, 'collector', None)
+        if collector is None:
+            return render(self, context)
+        collector.enter()
+        try:
+            return render(self, context)
+        finally:
+            collector.exit(
+                str(self.origin.template_name or self.origin.name)
+            )
+
+    instrumented_render.instrumented = True
+    Template.render = instrumented_render
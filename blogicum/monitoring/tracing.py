@@ -0,0 +1,187 @@
+"""Request traces written as spans to a local JSON-lines file.
+
+With ``TRACING`` on, ``install()`` wraps the points worth timing: every
+``MiddlewareMixin`` middleware, the methods of class-based views,
+``Template.render``, and the methods of the configured cache backends.
+``TracingMiddleware`` opens the root span and adds a span for each
+database query.  Spans of a finished request are appended to
+``TRACE_FILE``, one JSON object per line, in roughly the OpenTelemetry
+shape (trace_id, span_id, parent_id, name, kind, start, duration,
+attributes).  ``manage.py trace_view`` prints them as a tree.
+
+Outside of a traced request the wrappers cost one attribute lookup.
+"""
+import functools
+import json
+import os
+import random
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.template.base import Template
+from django.utils.deprecation import MiddlewareMixin
+
+from .middleware import route_name
+
+VIEW_METHODS = (
+    'dispatch', 'get', 'post', 'get_object', 'get_queryset',
+    'paginate_queryset', 'get_context_data', 'form_valid',
+)
+CACHE_METHODS = (
+    'get', 'set', 'add', 'delete', 'touch', 'has_key', 'incr',
+    'get_many', 'set_many', 'delete_many',
+)
+
+_state = threading.local()
+_write_lock = threading.Lock()
+
+
+class Trace:
+    def __init__(self):
+        self.trace_id = secrets.token_hex(16)
+        self.spans = []
+        self.stack = []
+
+
+def current_trace():
+    return getattr(_state, 'trace', None)
+
+
+@contextmanager
+def span(name, kind='internal', **attributes):
+    trace = current_trace()
+    if trace is None:
+        yield None
+        return
+    record = {
+        'trace_id': trace.trace_id,
+        'span_id': secrets.token_hex(8),
+        'parent_id': trace.stack[-1]['span_id'] if trace.stack else None,
+        'name': name,
+        'kind': kind,
+        'start': time.time(),
+        'duration': None,
+        'attributes': attributes,
+    }
+    trace.stack.append(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    except Exception as error:
+        attributes['error'] = repr(error)
+        raise
+    finally:
+        record['duration'] = time.perf_counter() - start
+        trace.stack.pop()
+        trace.spans.append(record)
+
+
+def traced(func, name, kind):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if current_trace() is None:
+            return func(*args, **kwargs)
+        with span(name, kind):
+            return func(*args, **kwargs)
+
+    wrapper.traced = True
+    return wrapper
+
+
+def instrument_class(cls, methods, kind, prefix):
+    """Wrap ``methods`` of ``cls`` in place, once."""
+    if cls.__dict__.get('_traced_methods'):
+        return
+    for method in methods:
+        func = getattr(cls, method, None)
+        if func is None or getattr(func, 'traced', False):
+            continue
+        setattr(cls, method, traced(func, f'{prefix}.{method}', kind))
+    cls._traced_methods = True
+
+
+def install():
+    if getattr(MiddlewareMixin.__call__, 'traced', False):
+        return
+    middleware_call = MiddlewareMixin.__call__
+
+    def traced_middleware(self, request):
+        if current_trace() is None:
+            return middleware_call(self, request)
+        with span(type(self).__name__, 'middleware'):
+            return middleware_call(self, request)
+
+    traced_middleware.traced = True
+    MiddlewareMixin.__call__ = traced_middleware
+
+    template_render = Template.render
+
+    def traced_render(self, context):
+        if current_trace() is None:
+            return template_render(self, context)
+        name = str(self.origin.template_name or self.origin.name)
+        with span(name, 'template'):
+            return template_render(self, context)
+
+    traced_render.traced = True
+    Template.render = traced_render
+
+    for alias in settings.CACHES:
+        cache_class = type(caches[alias])
+        instrument_class(
+            cache_class, CACHE_METHODS, 'cache',
+            f'cache.{cache_class.__name__}',
+        )
+
+
+def query_span(execute, sql, params, many, context):
+    with span('db.query', 'db', sql=sql, many=many):
+        return execute(sql, params, many, context)
+
+
+def export(spans):
+    path = settings.TRACE_FILE
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = ''.join(
+        json.dumps(record, ensure_ascii=False, default=str) + '\n'
+        for record in spans
+    )
+    with _write_lock, open(path, 'a', encoding='utf-8') as output:
+        output.write(data)
+
+
+class TracingMiddleware:
+    def __init__(self, get_response):
+        if not settings.TRACING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.TRACE_SAMPLE_RATE:
+            return self.get_response(request)
+        trace = _state.trace = Trace()
+        try:
+            root_span = span(
+                'request', 'server', method=request.method, path=request.path
+            )
+            with root_span as root, connection.execute_wrapper(query_span):
+                response = self.get_response(request)
+                root['attributes']['status'] = response.status_code
+            root['name'] = f'{request.method} {route_name(request)}'
+        finally:
+            _state.trace = None
+        export(reversed(trace.spans))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        if view_class is not None:
+            instrument_class(
+                view_class, VIEW_METHODS, 'view', view_class.__name__
+            )
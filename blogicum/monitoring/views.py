@@ -0,0 +1,33 @@
+import hmac
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+
+from .metrics import registry
+
+
+def has_metrics_token(request):
+    """The request carries ``Authorization: Bearer <METRICS_TOKEN>``.
+
+    The client address is no proof: behind the local reverse proxy every
+    request comes from 127.0.0.1.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        return False
+    scheme, _, credentials = request.META.get(
+        'HTTP_AUTHORIZATION', ''
+    ).partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(
+        credentials.encode(), token.encode()
+    )
+
+
+def metrics_view(request):
+    if not (has_metrics_token(request) or request.user.is_staff):
+        raise PermissionDenied
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -0,0 +1,32 @@
+document.addEventListener('DOMContentLoaded', function () {
+  document.querySelectorAll('select[data-autocomplete-url]').forEach(function (select) {
+    var search = document.createElement('input');
+    var timer = null;
+    search.type = 'search';
+    search.className = 'form-control mb-1';
+    search.placeholder = 'Начните вводить название';
+    select.parentNode.insertBefore(search, select);
+
+    search.addEventListener('input', function () {
+      clearTimeout(timer);
+      timer = setTimeout(function () {
+        var url = select.dataset.autocompleteUrl + '?q=' + encodeURIComponent(search.value);
+        fetch(url, {credentials: 'same-origin'})
+          .then(function (response) { return response.json(); })
+          .then(function (data) {
+            var current = select.value;
+            Array.from(select.options).forEach(function (option) {
+              if (option.value && option.value !== current) {
+                option.remove();
+              }
+            });
+            data.results.forEach(function (item) {
+              if (String(item.id) !== current) {
+                select.add(new Option(item.text, item.id));
+              }
+            });
+          });
+      }, 250);
+    });
+  });
+});
@@ -0,0 +1,19 @@
+(function () {
+  var script = document.currentScript;
+  var loggedIn = document.cookie.split(/;\s*/).some(function (cookie) {
+    return cookie.indexOf(script.dataset.cookie + '=') === 0;
+  });
+  if (!loggedIn) {
+    return;
+  }
+  fetch(script.dataset.url, {credentials: 'same-origin'})
+    .then(function (response) { return response.json(); })
+    .then(function (fragments) {
+      document.querySelectorAll('[data-fragment]').forEach(function (node) {
+        var html = fragments[node.dataset.fragment];
+        if (html !== undefined) {
+          node.innerHTML = html;
+        }
+      });
+    });
+})();
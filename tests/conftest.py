@@ -41,6 +41,18 @@ def enable_debug_false():
         yield
 
 
+@pytest.fixture(autouse=True)
+def raise_on_nplusone(settings):
+    settings.NPLUSONE = 'raise'
+
+
+@pytest.fixture(scope='session', autouse=True)
+def reftables_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp('reftables') / 'reftables.bin'
+    with override_settings(REFTABLES_PATH=path):
+        yield path
+
+
 class SafeImportFromContextManager:
     def __init__(
         self,
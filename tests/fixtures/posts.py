@@ -100,6 +100,14 @@ def post_with_published_location(
     return post
 
 
+@pytest.fixture
+def visible_post(post_with_published_location):
+    post = post_with_published_location
+    post.pub_date = timezone.now() - timedelta(days=1)
+    post.save()
+    return post
+
+
 @pytest.fixture
 def many_posts_with_published_locations(
     mixer: Mixer, user, published_locations, published_category
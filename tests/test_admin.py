@@ -0,0 +1,186 @@
+from http import HTTPStatus
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def _count_changelist_queries(client, url):
+    with CaptureQueriesContext(connection) as captured:
+        response = client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    return len(captured.captured_queries)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'model, url',
+    [('blog.Post', '/admin/blog/post/'),
+     ('blog.Comment', '/admin/blog/comment/')],
+)
+def test_admin_changelist_has_no_n_plus_one(admin_client, mixer, model, url):
+    mixer.cycle(2).blend(model)
+    few = _count_changelist_queries(admin_client, url)
+    mixer.cycle(10).blend(model)
+    many = _count_changelist_queries(admin_client, url)
+    assert many == few, (
+        f'Убедитесь, что число запросов на странице `{url}` не растёт'
+        ' с количеством строк.'
+    )
+
+
+@pytest.mark.django_db
+def test_admin_post_form_has_no_full_selects(admin_client, mixer):
+    mixer.cycle(5).blend(get_user_model())
+    response = admin_client.get('/admin/blog/post/add/')
+    assert response.status_code == HTTPStatus.OK
+    content = response.content.decode()
+    assert 'vForeignKeyRawIdAdminField' in content
+    assert 'admin-autocomplete' in content
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('term', ['индекс', 'ИНДЕКСИРОВАННЫЙ ЗАГ', 'AUTHOR'])
+def test_admin_post_search(admin_client, mixer, term):
+    author = mixer.blend(get_user_model(), username='Author')
+    post = mixer.blend(
+        'blog.Post', title='Индексированный заголовок', author=author
+    )
+    other = mixer.blend('blog.Post', title='Другой заголовок')
+    response = admin_client.get('/admin/blog/post/', {'q': term})
+    assert response.status_code == HTTPStatus.OK
+    assert list(response.context['cl'].result_list) == [post], (
+        'Убедитесь, что поиск публикаций в админке находит заголовок по'
+        ' началу без учёта регистра и автора по имени без учёта регистра.'
+    )
+    assert other.title not in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_admin_post_search_uses_prefix_index(admin_client, mixer):
+    mixer.cycle(5).blend('blog.Post')
+    with CaptureQueriesContext(connection) as captured:
+        response = admin_client.get('/admin/blog/post/', {'q': 'Индекс'})
+    assert response.status_code == HTTPStatus.OK
+    searches = [
+        q['sql'] for q in captured.captured_queries
+        if '"blog_post"."search_key" LIKE' in q['sql']
+    ]
+    assert searches, (
+        'Убедитесь, что поиск публикаций в админке идёт по префиксу'
+        ' ключа поиска.'
+    )
+    for sql in searches:
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        assert 'SCAN blog_post' not in plan, (
+            'Убедитесь, что поиск публикаций в админке не просматривает'
+            f' всю таблицу: {plan}'
+        )
+        assert 'blog_post_search_key' in plan, (
+            'Убедитесь, что поиск публикаций в админке использует индекс'
+            f' ключа поиска: {plan}'
+        )
+
+
+def _post_action(client, url, action, ids, **extra):
+    data = {'action': action, '_selected_action': ids, 'index': 0, **extra}
+    return client.post(url, data)
+
+
+@pytest.mark.django_db
+def test_admin_unpublish_is_one_update(admin_client, mixer):
+    posts = mixer.cycle(5).blend('blog.Post', is_published=True)
+    with CaptureQueriesContext(connection) as captured:
+        response = _post_action(
+            admin_client, '/admin/blog/post/', 'unpublish',
+            [post.pk for post in posts],
+        )
+    assert response.status_code == HTTPStatus.FOUND
+    updates = [
+        q for q in captured.captured_queries
+        if q['sql'].startswith('UPDATE')
+    ]
+    assert len(updates) == 1
+    assert not any(
+        post.is_published
+        for post in type(posts[0]).objects.filter(pk__in=[p.pk for p in posts])
+    )
+
+
+@pytest.mark.django_db
+def test_admin_unpublish_by_author(admin_client, mixer, user):
+    post = mixer.blend('blog.Post', author=user, is_published=True)
+    other_post = mixer.blend('blog.Post', author=user, is_published=True)
+    comment = mixer.blend('blog.Comment', author=user, is_published=True)
+    _post_action(
+        admin_client, '/admin/blog/post/', 'unpublish_by_author', [post.pk]
+    )
+    for obj in (post, other_post, comment):
+        obj.refresh_from_db()
+        assert not obj.is_published
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url', [
+    '/admin/blog/post/?is_published__exact=1',
+    '/admin/blog/comment/?is_published__exact=1',
+])
+def test_admin_unpublish_by_author_from_filtered_list(
+    admin_client, mixer, user, url
+):
+    post = mixer.blend('blog.Post', author=user, is_published=True)
+    comment = mixer.blend(
+        'blog.Comment', post=post, author=user, is_published=True
+    )
+    selected = post if 'post' in url else comment
+    _post_action(admin_client, url, 'unpublish_by_author', [selected.pk])
+    for obj in (post, comment):
+        obj.refresh_from_db()
+        assert not obj.is_published, (
+            'Убедитесь, что действие «снять всё от авторов» из'
+            ' отфильтрованного списка снимает с публикации и публикации,'
+            ' и комментарии.'
+        )
+
+
+@pytest.mark.django_db
+def test_admin_move_to_category(admin_client, mixer, another_category):
+    posts = mixer.cycle(3).blend('blog.Post')
+    _post_action(
+        admin_client, '/admin/blog/post/', 'move_to_category',
+        [post.pk for post in posts], category=another_category.pk,
+    )
+    for post in posts:
+        post.refresh_from_db()
+        assert post.category_id == another_category.pk
+
+
+@pytest.mark.django_db
+def test_admin_pages_past_count_limit(admin_client, mixer, monkeypatch):
+    from blog import admin as blog_admin
+
+    monkeypatch.setattr(blog_admin, 'ADMIN_COUNT_LIMIT', 4)
+    monkeypatch.setattr(blog_admin.PostAdmin, 'list_per_page', 2)
+    mixer.cycle(9).blend('blog.Post')
+    url = '/admin/blog/post/'
+    response = admin_client.get(url, {'p': 2})
+    content = response.content.decode()
+    assert 'более 4' in content, (
+        'Убедитесь, что админка показывает, что число записей ограничено.'
+    )
+    assert '?p=3' in content, (
+        'Убедитесь, что со страницы на границе ограничения можно перейти'
+        ' на следующую.'
+    )
+    for page, rows in ((4, 2), (5, 1)):
+        response = admin_client.get(url, {'p': page})
+        assert response.status_code == HTTPStatus.OK, (
+            'Убедитесь, что страницы за пределом подсчёта доступны.'
+        )
+        assert len(response.context['cl'].result_list) == rows
+    assert '?p=6' not in response.content.decode()
+    response = admin_client.get(url, {'p': 6})
+    assert response.status_code == HTTPStatus.FOUND
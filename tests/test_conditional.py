@@ -0,0 +1,107 @@
+from http import HTTPStatus
+
+import pytest
+from django.test import Client
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url', [
+    '/', '/posts/{post.id}/', '/profile/{post.author.username}/',
+    '/category/{post.category.slug}/',
+])
+def test_not_modified(user_client, visible_post, url):
+    url = url.format(post=visible_post)
+    response = user_client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    assert response.has_header('ETag'), (
+        f'Убедитесь, что ответ на `{url}` содержит заголовок `ETag`.'
+    )
+    response = user_client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+        f'Убедитесь, что `{url}` отвечает 304 на запрос с актуальным'
+        ' `If-None-Match`.'
+    )
+    assert not response.content
+
+
+@pytest.mark.django_db
+def test_comment_changes_validators(user_client, visible_post):
+    urls = ['/', f'/posts/{visible_post.id}/']
+    etags = {url: user_client.get(url)['ETag'] for url in urls}
+    user_client.post(
+        f'/posts/{visible_post.id}/comment/', data={'text': 'Новый'}
+    )
+    for url, etag in etags.items():
+        response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Убедитесь, что после нового комментария `{url}` отдаётся'
+            ' заново, а не отвечает 304.'
+        )
+        assert response['ETag'] != etag
+
+
+@pytest.mark.django_db
+def test_etag_depends_on_user(user_client, unlogged_client, visible_post):
+    url = f'/posts/{visible_post.id}/'
+    etag = user_client.get(url)['ETag']
+    response = unlogged_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK, (
+        'Убедитесь, что `ETag` страницы зависит от пользователя: страница'
+        ' автора отличается от страницы для анонимного посетителя.'
+    )
+
+
+@pytest.mark.django_db
+def test_profile_edit_changes_validators(user, user_client, visible_post):
+    url = f'/profile/{user.username}/'
+    etag = user_client.get(url)['ETag']
+    user.first_name = 'Новое'
+    user.last_name = 'Имя'
+    user.save()
+    response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK, (
+        'Убедитесь, что после редактирования профиля его страница отдаётся'
+        ' заново, а не отвечает 304.'
+    )
+
+
+@pytest.mark.django_db
+def test_post_page_has_no_last_modified(user_client, visible_post):
+    response = user_client.get(f'/posts/{visible_post.id}/')
+    assert not response.has_header('Last-Modified'), (
+        'Убедитесь, что страница публикации не отдаёт `Last-Modified`:'
+        ' дата изменения публикации не учитывает категорию, место и автора.'
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('renamed, url', [
+    ('author', '/'),
+    ('author', '/posts/{post.id}/'),
+    ('commenter', '/posts/{post.id}/'),
+])
+def test_rename_changes_validators(
+    unlogged_client, mixer, visible_post, renamed, url
+):
+    url = url.format(post=visible_post)
+    user = visible_post.author
+    if renamed == 'commenter':
+        user = mixer.blend('blog.Comment', post=visible_post).author
+    etag = unlogged_client.get(url)['ETag']
+    user.username = f'{user.username}-new'
+    user.save()
+    response = unlogged_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK, (
+        f'Убедитесь, что после смены имени пользователя `{url}` отдаётся'
+        ' заново с новыми ссылками на профиль, а не отвечает 304.'
+    )
+    assert f'/profile/{user.username}/' in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_login_keeps_validators(user, user_client, visible_post):
+    url = f'/posts/{visible_post.id}/'
+    etag = user_client.get(url)['ETag']
+    Client().force_login(visible_post.author)
+    response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
@@ -0,0 +1,130 @@
+from http import HTTPStatus
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from blog import deletion
+from blog.models import Comment, Post
+
+
+@pytest.mark.django_db
+def test_delete_post_is_set_based(user_client, mixer, user):
+    post = mixer.blend('blog.Post', author=user)
+    mixer.cycle(20).blend('blog.Comment', post=post)
+    with CaptureQueriesContext(connection) as captured:
+        response = user_client.post(f'/posts/{post.id}/delete/')
+    assert response.status_code == HTTPStatus.FOUND
+    selects = [
+        q['sql'] for q in captured.captured_queries
+        if q['sql'].startswith('SELECT') and 'blog_comment' in q['sql']
+        and 'COUNT' not in q['sql']
+    ]
+    assert not selects, 'Комментарии не должны загружаться при удалении.'
+    assert not Post.objects.filter(pk=post.pk).exists()
+    assert not Comment.objects.filter(post_id=post.pk).exists()
+
+
+@pytest.mark.django_db
+def test_large_post_is_tombstoned(user_client, mixer, user, monkeypatch):
+    monkeypatch.setattr(deletion, 'BULK_DELETE_THRESHOLD', 5)
+    post = mixer.blend('blog.Post', author=user)
+    mixer.cycle(10).blend('blog.Comment', post=post)
+    user_client.post(f'/posts/{post.id}/delete/')
+    post.refresh_from_db()
+    assert post.deleted_on is not None
+    assert user_client.get(f'/posts/{post.id}/').status_code == (
+        HTTPStatus.NOT_FOUND
+    )
+    call_command('purge_deleted', batch_size=3, pause=0)
+    assert not Post.objects.filter(pk=post.pk).exists()
+    assert not Comment.objects.filter(post_id=post.pk).exists()
+
+
+@pytest.mark.django_db
+def test_large_user_is_left_to_purge(mixer, user, another_user, monkeypatch):
+    monkeypatch.setattr(deletion, 'BULK_DELETE_THRESHOLD', 5)
+    post = mixer.blend('blog.Post', author=user)
+    mixer.cycle(10).blend('blog.Comment', post=post, author=another_user)
+    assert not deletion.delete_user(user)
+    user.refresh_from_db()
+    assert not user.is_active
+    call_command('purge_deleted', batch_size=3, pause=0)
+    assert not get_user_model().objects.filter(pk=user.pk).exists(), (
+        'Убедитесь, что `purge_deleted` удаляет пользователя, удаление'
+        ' которого было отложено из-за большого числа комментариев.'
+    )
+    assert not Comment.objects.filter(post_id=post.pk).exists()
+
+
+@pytest.mark.django_db
+def test_delete_user_removes_content(mixer, user, another_user):
+    post = mixer.blend('blog.Post', author=user)
+    mixer.cycle(3).blend('blog.Comment', post=post, author=another_user)
+    own_comment = mixer.blend('blog.Comment', author=user)
+    assert deletion.delete_user(user)
+    assert not get_user_model().objects.filter(pk=user.pk).exists()
+    assert not Post.objects.filter(pk=post.pk).exists()
+    assert not Comment.objects.filter(pk=own_comment.pk).exists()
+
+
+@pytest.mark.django_db
+def test_bench_delete_leaves_no_rows():
+    call_command('bench_delete', comments=50)
+    assert not Post.objects.exists()
+
+
+@pytest.mark.django_db
+def test_soft_delete_mode(user_client, mixer, user, settings):
+    settings.BLOG_SOFT_DELETE = True
+    post = mixer.blend('blog.Post', author=user)
+    comment = mixer.blend('blog.Comment', post=post, author=user)
+    other_post = mixer.blend('blog.Post', author=user)
+    user_client.post(
+        f'/posts/{other_post.id}/delete_comment/{comment.id}/'
+    )
+    user_client.post(f'/posts/{post.id}/delete_comment/{comment.id}/')
+    comment.refresh_from_db()
+    assert comment.deleted_on is not None
+    response = user_client.get(f'/posts/{post.id}/')
+    assert comment.text not in response.content.decode()
+
+    user_client.post(f'/posts/{post.id}/delete/')
+    post.refresh_from_db()
+    assert post.deleted_on is not None
+
+    call_command('purge_deleted', batch_size=1, pause=0)
+    assert not Post.objects.filter(pk=post.pk).exists()
+    assert not Comment.objects.filter(pk=comment.pk).exists()
+    assert Post.objects.filter(pk=other_post.pk).exists()
+
+
+@pytest.mark.django_db
+def test_soft_delete_user_waits_for_purge(mixer, user, another_user, settings):
+    settings.BLOG_SOFT_DELETE = True
+    post = mixer.blend('blog.Post', author=user)
+    foreign_comment = mixer.blend('blog.Comment', post=post, author=another_user)
+    own_comment = mixer.blend('blog.Comment', author=user)
+    assert not deletion.delete_user(user)
+    user.refresh_from_db()
+    assert not user.is_active
+    post.refresh_from_db()
+    own_comment.refresh_from_db()
+    assert post.deleted_on is not None and own_comment.deleted_on is not None, (
+        'Убедитесь, что в режиме мягкого удаления публикации и комментарии'
+        ' пользователя только помечаются удалёнными.'
+    )
+    assert Comment.objects.filter(pk=foreign_comment.pk).exists()
+
+    call_command('purge_deleted', batch_size=1, pause=0)
+    assert not get_user_model().objects.filter(pk=user.pk).exists(), (
+        'Убедитесь, что `purge_deleted` удаляет пользователя после его'
+        ' публикаций и комментариев.'
+    )
+    assert not Post.objects.filter(pk=post.pk).exists()
+    assert not Comment.objects.filter(
+        pk__in=[own_comment.pk, foreign_comment.pk]
+    ).exists()
+    assert get_user_model().objects.filter(pk=another_user.pk).exists()
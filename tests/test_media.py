@@ -0,0 +1,361 @@
+import os
+from io import BytesIO
+
+import pytest
+from PIL import Image
+from bs4 import BeautifulSoup
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+
+from blog.models import Post
+
+
+def make_image(color='red', fmt='JPEG'):
+    data = BytesIO()
+    Image.new('RGB', (40, 30), color).save(data, fmt)
+    return data.getvalue()
+
+
+@pytest.fixture
+def media_root(tmp_path, settings):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+@pytest.mark.django_db
+def test_images_are_content_addressed(media_root, mixer, user):
+    first = mixer.blend('blog.Post', author=user, image=None)
+    second = mixer.blend('blog.Post', author=user, image=None)
+    first.image = SimpleUploadedFile('a.JPG', make_image())
+    first.save()
+    second.image = SimpleUploadedFile('b.jpg', make_image())
+    second.save()
+    assert first.image.name == second.image.name
+    assert Post._meta.get_field('image').storage.is_hashed(first.image.name)
+    assert first.image.name.startswith('post_images/')
+    assert len(list(media_root.rglob('*.jpg'))) == 1
+
+
+def test_concurrent_identical_uploads_share_one_file(media_root):
+    from django.core.files.uploadedfile import TemporaryUploadedFile
+
+    storage = Post._meta.get_field('image').storage
+    data = make_image()
+    name = storage.hashed_name('post_images/a.jpg', SimpleUploadedFile(
+        'a.jpg', data
+    ))
+    # Both uploads passed the exists() check; the first one wins the write.
+    assert storage._save(name, SimpleUploadedFile('a.jpg', data)) == name
+    staged = TemporaryUploadedFile('b.jpg', 'image/jpeg', len(data), None)
+    staged.write(data)
+    staged.flush()
+    assert storage._save(name, staged) == name
+    staged.close()
+    assert storage._save(name, SimpleUploadedFile('c.jpg', data)) == name
+    assert [path.name for path in media_root.rglob('*.*')] == [
+        os.path.basename(name)
+    ], 'Убедитесь, что одинаковые загрузки не создают копий файла.'
+    assert (media_root / name).read_bytes() == data
+
+
+@pytest.mark.django_db
+def test_rehash_post_images(media_root, mixer, user):
+    (media_root / 'post_images').mkdir()
+    (media_root / 'post_images' / 'old.jpg').write_bytes(make_image('blue'))
+    post = mixer.blend('blog.Post', author=user, image='post_images/old.jpg')
+    mixer.blend('blog.Post', author=user, image='post_images/missing.jpg')
+    call_command('rehash_post_images', batch_size=1)
+    post.refresh_from_db()
+    storage = Post._meta.get_field('image').storage
+    assert storage.is_hashed(post.image.name)
+    assert post.image.read() == make_image('blue')
+
+
+@pytest.mark.django_db
+def test_collect_orphan_media(media_root, tmp_path_factory, mixer, user):
+    post = mixer.blend('blog.Post', author=user, image=None)
+    post.image = SimpleUploadedFile('a.jpg', make_image())
+    post.save()
+    orphan = media_root / 'post_images' / 'orphan.jpg'
+    orphan.write_bytes(make_image('green'))
+
+    call_command('collect_orphan_media', grace=0, dry_run=True)
+    assert orphan.exists()
+
+    quarantine = tmp_path_factory.mktemp('quarantine')
+    call_command('collect_orphan_media', grace=0, quarantine=str(quarantine))
+    assert not orphan.exists()
+    assert (quarantine / 'post_images' / 'orphan.jpg').exists()
+    assert (media_root / post.image.name).exists()
+
+
+@pytest.mark.django_db
+def test_collect_orphan_media_skips_fresh_files(media_root):
+    (media_root / 'post_images').mkdir()
+    fresh = media_root / 'post_images' / 'fresh.jpg'
+    fresh.write_bytes(make_image())
+    call_command('collect_orphan_media')
+    assert fresh.exists()
+
+
+@pytest.mark.django_db
+def test_reused_orphan_survives_collection(media_root, mixer, user):
+    post = mixer.blend('blog.Post', author=user, image=None)
+    post.image = SimpleUploadedFile('a.jpg', make_image())
+    post.save()
+    path = media_root / post.image.name
+    os.utime(path, (0, 0))
+    Post.objects.filter(pk=post.pk).update(image='')
+
+    storage = Post._meta.get_field('image').storage
+    storage.save(
+        'post_images/b.jpg', SimpleUploadedFile('b.jpg', make_image())
+    )
+    call_command('collect_orphan_media', grace=3600)
+    assert path.exists(), (
+        'Убедитесь, что файл, повторно использованный новой загрузкой,'
+        ' не удаляется сборщиком до сохранения ссылки на него.'
+    )
+
+
+@pytest.fixture
+def image_post(media_root, mixer, user, published_category):
+    post = mixer.blend(
+        'blog.Post', author=user, category=published_category,
+        is_published=True, image=None,
+    )
+    post.image = SimpleUploadedFile('a.jpg', make_image())
+    post.save()
+    return post
+
+
+@pytest.mark.django_db
+def test_media_view_serves_published_image(client, image_post):
+    url = image_post.image.url
+    assert url.startswith('/media/post_images/')
+    response = client.get(url)
+    assert response.status_code == 200
+    assert b''.join(response.streaming_content) == make_image()
+    assert 'public' in response['Cache-Control']
+    assert 'max-age=0' in response['Cache-Control'], (
+        'Убедитесь, что публичные изображения перепроверяются: после снятия'
+        ' публикации они не должны отдаваться из кэша.'
+    )
+    assert client.get(
+        url, HTTP_IF_NONE_MATCH=response['ETag']
+    ).status_code == 304
+
+    partial = client.get(url, HTTP_RANGE='bytes=0-9')
+    assert partial.status_code == 206
+    assert b''.join(partial.streaming_content) == make_image()[:10]
+    assert partial['Content-Range'].startswith('bytes 0-9/')
+    assert client.get(url, HTTP_RANGE='bytes=999999-').status_code == 416
+
+
+@pytest.mark.django_db
+def test_media_view_hides_unpublished_image(
+    client, user_client, another_user_client, image_post
+):
+    image_post.is_published = False
+    image_post.save()
+    url = image_post.image.url
+    assert client.get(url).status_code == 404
+    assert another_user_client.get(url).status_code == 404
+    response = user_client.get(url)
+    assert response.status_code == 200
+    assert 'private' in response['Cache-Control']
+    assert client.get('/media/post_images/../../manage.py').status_code == 404
+
+
+@pytest.mark.django_db
+def test_media_view_accel_redirect(client, image_post, settings):
+    settings.MEDIA_ACCEL = 'nginx'
+    response = client.get(image_post.image.url)
+    assert response['X-Accel-Redirect'] == (
+        '/protected-media/' + image_post.image.name
+    )
+    assert response.content == b''
+
+
+def make_wide_image(width=1200, height=600):
+    data = BytesIO()
+    Image.new('RGB', (width, height), 'navy').save(data, 'JPEG')
+    return data.getvalue()
+
+
+@pytest.mark.django_db
+def test_image_variants_and_srcset(client, image_post, media_root):
+    image_post.image = SimpleUploadedFile('wide.jpg', make_wide_image())
+    image_post.save()
+    response = client.get(f'/posts/{image_post.id}/')
+    img = BeautifulSoup(response.content.decode(), 'html.parser').find(
+        'img', srcset=True
+    )
+    assert img is not None
+    assert (img['width'], img['height']) == ('1200', '600')
+    assert '320w' in img['srcset'] and '1200w' in img['srcset']
+
+    variant_url = img['srcset'].split(',')[0].split()[0]
+    variant = client.get(variant_url)
+    assert variant.status_code == 200
+    with Image.open(BytesIO(b''.join(variant.streaming_content))) as result:
+        assert result.size == (320, 160)
+    assert client.get(
+        variant_url.replace('/320/', '/321/')
+    ).status_code == 404
+
+    feed = client.get('/').content.decode()
+    assert 'loading="lazy"' in feed
+
+
+@pytest.mark.django_db
+def test_srcset_uses_oriented_size(client, image_post):
+    data = BytesIO()
+    image = Image.new('RGB', (1200, 600), 'navy')
+    exif = image.getexif()
+    exif[0x0112] = 6
+    image.save(data, 'JPEG', exif=exif)
+    image_post.image = SimpleUploadedFile('rotated.jpg', data.getvalue())
+    image_post.save()
+    response = client.get(f'/posts/{image_post.id}/')
+    img = BeautifulSoup(response.content.decode(), 'html.parser').find(
+        'img', srcset=True
+    )
+    assert (img['width'], img['height']) == ('600', '1200'), (
+        'Убедитесь, что размеры изображения в `srcset` учитывают'
+        ' ориентацию из EXIF.'
+    )
+    assert img['srcset'].split(', ')[-1].endswith(' 600w')
+    assert '640w' not in img['srcset']
+    variant = client.get(img['srcset'].split()[0])
+    with Image.open(BytesIO(b''.join(variant.streaming_content))) as result:
+        assert result.size == (320, 640)
+
+
+@pytest.mark.django_db
+def test_orphan_variants_are_collected(client, image_post, media_root):
+    image_post.image = SimpleUploadedFile('wide.jpg', make_wide_image())
+    image_post.save()
+    name = image_post.image.name
+    assert client.get(f'/media/variants/320/{name}').status_code == 200
+    variant = media_root / 'variants' / '320' / name
+    assert variant.exists()
+    assert not list(media_root.rglob('*.jpg.lock')), (
+        'Убедитесь, что после создания уменьшенной копии не остаётся'
+        ' отдельного файла блокировки.'
+    )
+
+    call_command('collect_orphan_media', grace=0)
+    assert variant.exists()
+    Post.objects.filter(pk=image_post.pk).update(image='')
+    call_command('collect_orphan_media', grace=0)
+    assert not variant.exists(), (
+        'Убедитесь, что `collect_orphan_media` удаляет уменьшенные копии'
+        ' изображений, на которые больше никто не ссылается.'
+    )
+
+
+@pytest.mark.django_db
+def test_collect_orphan_media_sweeps_aborted_uploads(media_root):
+    staging = media_root / '.uploads'
+    staging.mkdir()
+    aborted = staging / 'tmpabc.upload.jpg'
+    aborted.write_bytes(b'partial')
+    os.utime(aborted, (0, 0))
+    in_flight = staging / 'tmpdef.upload.jpg'
+    in_flight.write_bytes(b'partial')
+    call_command('collect_orphan_media')
+    assert not aborted.exists(), (
+        'Убедитесь, что `collect_orphan_media` удаляет файлы, оставшиеся'
+        ' в `.uploads` от прерванных загрузок.'
+    )
+    assert in_flight.exists()
+
+
+@pytest.mark.django_db
+def test_image_variant_hidden_for_unpublished(client, image_post):
+    image_post.image = SimpleUploadedFile('wide.jpg', make_wide_image())
+    image_post.is_published = False
+    image_post.save()
+    url = f'/media/variants/320/{image_post.image.name}'
+    assert client.get(url).status_code == 404
+
+
+def make_rotated_image(fmt='JPEG'):
+    data = BytesIO()
+    image = Image.new('RGB', (60, 20), 'white')
+    exif = image.getexif()
+    exif[0x0112] = 6
+    exif[0x010F] = 'Camera'
+    image.save(data, fmt, exif=exif)
+    return data.getvalue()
+
+
+def post_form_data(category, **extra):
+    return {
+        'title': 'Заголовок',
+        'text': 'Текст',
+        'pub_date': '2020-01-01T10:00',
+        'category': category.pk,
+        **extra,
+    }
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('fmt, name', [
+    ('JPEG', 'photo.jpg'), ('PNG', 'photo.png'), ('WEBP', 'photo.webp'),
+])
+def test_upload_normalizes_orientation_and_strips_exif(
+    media_root, user_client, user, published_category, fmt, name
+):
+    response = user_client.post('/posts/create/', post_form_data(
+        published_category,
+        image=SimpleUploadedFile(name, make_rotated_image(fmt)),
+    ))
+    assert response.status_code == 302
+    post = Post.objects.get(author=user)
+    with Image.open(media_root / post.image.name) as stored:
+        assert stored.size == (20, 60)
+        assert not stored.getexif()
+    assert not list((media_root / '.uploads').iterdir())
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('content, name', [
+    (b'not an image at all', 'fake.jpg'),
+    (make_image(fmt='BMP'), 'image.bmp'),
+    (make_image(fmt='PNG')[:-20], 'truncated.png'),
+])
+def test_upload_rejects_non_images(
+    media_root, user_client, published_category, content, name
+):
+    response = user_client.post('/posts/create/', post_form_data(
+        published_category, image=SimpleUploadedFile(name, content),
+    ))
+    assert response.status_code == 200
+    assert response.context['form'].errors['image']
+    assert not Post.objects.exists()
+
+
+@pytest.mark.django_db
+def test_upload_enforces_size_limit(
+    media_root, user_client, published_category, settings
+):
+    settings.POST_IMAGE_MAX_SIZE = 100
+    response = user_client.post('/posts/create/', post_form_data(
+        published_category,
+        image=SimpleUploadedFile('big.jpg', make_wide_image()),
+    ))
+    assert 'МБ' in response.context['form'].errors['image'][0]
+
+
+@pytest.mark.django_db
+def test_upload_views_keep_csrf_protection(user, published_category):
+    from django.test import Client
+
+    client = Client(enforce_csrf_checks=True)
+    client.force_login(user)
+    response = client.post('/posts/create/', post_form_data(
+        published_category,
+    ))
+    assert response.status_code == 403
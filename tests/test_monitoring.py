@@ -0,0 +1,317 @@
+import json
+import os
+import re
+
+import pytest
+
+from monitoring import metrics
+
+
+@pytest.fixture
+def metrics_dir(tmp_path, settings):
+    settings.METRICS_DIR = tmp_path
+    metrics.registry.__init__()
+    return tmp_path
+
+
+def sample(text, name, **labels):
+    for line in text.splitlines():
+        if not line.startswith(name):
+            continue
+        if all(f'{key}="{value}"' in line for key, value in labels.items()):
+            return float(line.rsplit(' ', 1)[1])
+    return None
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint(
+    client, settings, metrics_dir, post_with_published_location
+):
+    settings.METRICS_TOKEN = 'секретный-токен'
+    client.get('/')
+    client.get(f'/posts/{post_with_published_location.id}/')
+    client.get('/posts/987654/')
+    response = client.get(
+        '/metrics', HTTP_AUTHORIZATION='Bearer секретный-токен'
+    )
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+    text = response.content.decode()
+    assert sample(
+        text, 'blogicum_http_requests_total',
+        view='blog:index', status='200',
+    ) == 1
+    assert sample(
+        text, 'blogicum_http_requests_total',
+        view='blog:post_detail', status='404',
+    ) == 1
+    assert sample(
+        text, 'blogicum_http_request_duration_seconds_count',
+        view='blog:post_detail',
+    ) == 2
+    assert sample(text, 'blogicum_db_queries_total', view='blog:index') > 0
+    assert re.search(
+        r'blogicum_http_request_duration_seconds_bucket\{.*le="\+Inf"',
+        text,
+    )
+
+
+def test_metrics_merge_across_workers(metrics_dir):
+    other_worker = {
+        'pid': 999999999,
+        'counters': [
+            ['blogicum_http_requests_total', [['view', 'blog:index']], 5],
+        ],
+        'gauges': [['some_gauge', [['pid', '999999999']], 1]],
+        'histograms': [],
+    }
+    (metrics_dir / '999999999.json').write_text(json.dumps(other_worker))
+    metrics.registry.inc(
+        'blogicum_http_requests_total', {'view': 'blog:index'}, 2
+    )
+    text = metrics.registry.render()
+    assert sample(
+        text, 'blogicum_http_requests_total', view='blog:index'
+    ) == 7
+    assert 'some_gauge' not in text
+
+
+def test_metrics_survive_pid_reuse_and_compaction(metrics_dir):
+    pid, start = metrics.registry.identity()
+    recycled = {
+        'pid': pid,
+        'start': start - 1,
+        'counters': [
+            ['blogicum_http_requests_total', [['view', 'blog:index']], 5],
+        ],
+        'gauges': [],
+        'histograms': [],
+    }
+    (metrics_dir / f'{pid}-{start - 1}.json').write_text(
+        json.dumps(recycled)
+    )
+    metrics.registry.inc(
+        'blogicum_http_requests_total', {'view': 'blog:index'}, 2
+    )
+    for _ in range(2):
+        text = metrics.registry.render()
+        assert sample(
+            text, 'blogicum_http_requests_total', view='blog:index'
+        ) == 7, (
+            'Убедитесь, что счётчики завершившегося процесса не теряются,'
+            ' когда его pid достаётся новому процессу.'
+        )
+    assert sorted(path.name for path in metrics_dir.glob('*.json')) == [
+        f'{pid}-{start}.json', 'aggregate.json',
+    ], (
+        'Убедитесь, что данные завершившихся процессов сворачиваются'
+        ' в общий файл.'
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('token, authorization', [
+    (None, ''),
+    (None, 'Bearer '),
+    ('секретный-токен', ''),
+    ('секретный-токен', 'Bearer другой'),
+])
+def test_metrics_endpoint_is_internal(
+    client, settings, metrics_dir, token, authorization
+):
+    settings.METRICS_TOKEN = token
+    response = client.get(
+        '/metrics', REMOTE_ADDR='127.0.0.1', HTTP_AUTHORIZATION=authorization
+    )
+    assert response.status_code == 403, (
+        'Убедитесь, что `/metrics` закрыт и для запросов с 127.0.0.1, которые'
+        ' приходят через обратный прокси, если нет токена.'
+    )
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint_for_staff(client, mixer, metrics_dir):
+    from django.contrib.auth import get_user_model
+
+    client.force_login(mixer.blend(get_user_model(), is_staff=True))
+    assert client.get('/metrics').status_code == 200
+
+
+@pytest.mark.django_db
+def test_slow_query_log(
+    client, settings, tmp_path, post_with_published_location
+):
+    import logging
+
+    from django.core.management import call_command
+
+    from monitoring.querylog import QueryLogHandler, fingerprint
+
+    settings.SLOW_QUERY_THRESHOLD = 0
+    settings.QUERY_SAMPLE_RATE = 0
+    log_path = tmp_path / 'logs' / 'queries.log'
+    handler = QueryLogHandler(str(log_path))
+    query_logger = logging.getLogger('monitoring.queries')
+    query_logger.addHandler(handler)
+    try:
+        client.get('/')
+    finally:
+        query_logger.removeHandler(handler)
+        handler.close()
+
+    records = [json.loads(line) for line in log_path.read_text().splitlines()]
+    assert records and all(r['view'] == 'blog:index' for r in records)
+    feed_query = next(r for r in records if 'blog_post' in r['sql'])
+    assert feed_query['plan']
+    assert feed_query['template'] is None or feed_query['template']
+
+    call_command('query_report', path=str(log_path), top=3)
+    assert fingerprint("SELECT 1 WHERE id IN (%s, %s) AND x = 'a'") == (
+        'SELECT ? WHERE id IN (...) AND x = ?'
+    )
+
+
+@pytest.mark.django_db
+def test_profiler_is_staff_only(
+    client, admin_client, settings, tmp_path, post_with_published_location
+):
+    settings.PROFILE_DIR = tmp_path
+    response = client.get('/?_profile=1')
+    assert response['Content-Type'].startswith('text/html'), (
+        'Профилирование должно быть доступно только персоналу.'
+    )
+    assert not list(tmp_path.iterdir())
+
+    response = admin_client.get('/?_profile=1')
+    report = response.content.decode()
+    assert response['Content-Type'].startswith('text/plain')
+    assert 'По слоям' in report and 'blog:index' in report
+    assert sorted(p.suffix for p in tmp_path.iterdir()) == [
+        '.folded', '.prof'
+    ]
+
+    response = admin_client.get('/', HTTP_X_PROFILE='store')
+    assert response['Content-Type'].startswith('text/html')
+    assert response['X-Profile-Report']
+
+
+@pytest.mark.django_db
+def test_template_render_metrics(
+    client, metrics_dir, many_posts_with_published_locations
+):
+    client.get('/')
+    text = metrics.registry.render()
+    post_cards = sample(
+        text, 'blogicum_template_renders_total',
+        view='blog:index', template='includes/post_card.html',
+    )
+    assert post_cards == 10, (
+        'Каждый {% include %} карточки поста должен учитываться отдельно.'
+    )
+    assert sample(
+        text, 'blogicum_template_render_seconds_count',
+        view='blog:index', template='blog/index.html',
+    ) == 1
+    page_queries = sample(
+        text, 'blogicum_db_queries_total', view='blog:index'
+    )
+    template_queries = sum(
+        float(line.rsplit(' ', 1)[1]) for line in text.splitlines()
+        if line.startswith('blogicum_template_queries_total')
+    )
+    assert template_queries <= page_queries
+
+
+@pytest.mark.django_db
+def test_nplusone_detector(mixer, admin_client):
+    from django.template import Context, Template
+
+    from blog.models import Comment, Post
+    from monitoring.nplusone import NPlusOneError, detect
+
+    mixer.cycle(4).blend(Post)
+    template = Template(
+        '{% for post in posts %}\n{{ post.author.username }}{% endfor %}'
+    )
+    with pytest.raises(NPlusOneError) as error:
+        with detect('raise'):
+            template.render(Context({'posts': Post.objects.all()}))
+    assert 'N+1: 4' in str(error.value)
+    assert ':2,' in str(error.value), (
+        'В отчёте должна быть строка шаблона, вызвавшая запросы.'
+    )
+
+    with detect('raise'):
+        template.render(Context({
+            'posts': Post.objects.select_related('author')
+        }))
+
+    mixer.cycle(4).blend(Comment)
+    with detect('raise'):
+        assert admin_client.get('/admin/blog/comment/').status_code == 200
+
+
+@pytest.mark.django_db
+def test_memory_middleware(
+    client, settings, metrics_dir, monkeypatch, post_with_published_location
+):
+    import signal
+
+    from monitoring import memory
+
+    settings.MEMORY_PROFILING = True
+    settings.MEMORY_SAMPLE_RATE = 1
+    settings.MEMORY_RSS_LIMIT = 1
+    kills = []
+    monkeypatch.setattr(
+        memory.os, 'kill',
+        lambda pid, sig: sig and kills.append((pid, sig)),
+    )
+    monkeypatch.setattr(memory.MemoryMiddleware, 'recycling', False)
+
+    client.get('/')
+    client.get('/')
+    text = metrics.registry.render()
+    assert sample(
+        text, 'blogicum_request_memory_peak_bytes_count', view='blog:index'
+    ) == 2
+    assert 'blogicum_request_allocated_bytes_total{site=' in text
+    assert sample(text, 'blogicum_process_rss_bytes') > 0
+    assert kills == [(os.getpid(), signal.SIGTERM)], (
+        'Процесс должен один раз запросить перезапуск при превышении RSS.'
+    )
+
+
+@pytest.mark.django_db
+def test_tracing(client, settings, tmp_path, post_with_published_location):
+    from django.core.management import call_command
+
+    from monitoring import tracing
+
+    settings.TRACING = True
+    settings.TRACE_FILE = tmp_path / 'spans.jsonl'
+    tracing.install()
+    client.get('/')
+
+    spans = [
+        json.loads(line)
+        for line in settings.TRACE_FILE.read_text().splitlines()
+    ]
+    by_id = {span['span_id']: span for span in spans}
+    root = spans[0]
+    assert root['parent_id'] is None and root['name'] == 'GET blog:index'
+    names = {span['name'] for span in spans}
+    assert {
+        'SessionMiddleware', 'IndexListView.get_queryset',
+        'IndexListView.get_context_data', 'blog/index.html',
+        'includes/post_card.html', 'db.query',
+    } <= names
+    assert any(span['kind'] == 'cache' for span in spans)
+    for span in spans[1:]:
+        assert span['parent_id'] in by_id, (
+            'У каждого спана должен быть родитель.'
+        )
+        assert span['trace_id'] == root['trace_id']
+
+    call_command('trace_view', path=str(settings.TRACE_FILE))
+    call_command('trace_view', 'last', path=str(settings.TRACE_FILE))
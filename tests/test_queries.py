@@ -0,0 +1,146 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def _post_queries(captured, post_id):
+    return [
+        q['sql'] for q in captured.captured_queries
+        if '"blog_post"."id" =' in q['sql'] and f'{post_id}' in q['sql']
+    ]
+
+
+@pytest.mark.django_db
+def test_post_detail_lookup_has_no_or(user_client, post_with_published_location):
+    post = post_with_published_location
+    with CaptureQueriesContext(connection) as captured:
+        response = user_client.get(f'/posts/{post.id}/')
+    assert response.status_code == HTTPStatus.OK
+    post_queries = _post_queries(captured, post.id)
+    assert post_queries, (
+        'Убедитесь, что публикация на странице поста запрашивается по `pk`.'
+    )
+    for sql in post_queries:
+        assert ' OR ' not in sql.upper(), (
+            'Убедитесь, что запрос публикации на странице поста не содержит'
+            ' условия `OR`, которое не обслуживается одним индексом.'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        assert 'SCAN blog_post' not in plan, (
+            'Убедитесь, что публикация на странице поста ищется по индексу'
+            f' первичного ключа, а не полным просмотром таблицы: {plan}'
+        )
+
+
+@pytest.mark.django_db
+def test_unpublished_post_detail_visibility(
+    user_client, another_user_client, unlogged_client,
+    unpublished_posts_with_published_locations,
+):
+    post = unpublished_posts_with_published_locations[0]
+    url = f'/posts/{post.id}/'
+    assert user_client.get(url).status_code == HTTPStatus.OK, (
+        'Убедитесь, что автор видит свою снятую с публикации публикацию.'
+    )
+    assert another_user_client.get(url).status_code == HTTPStatus.NOT_FOUND, (
+        'Убедитесь, что снятая с публикации публикация недоступна'
+        ' другим пользователям.'
+    )
+    assert unlogged_client.get(url).status_code == HTTPStatus.NOT_FOUND, (
+        'Убедитесь, что снятая с публикации публикация недоступна'
+        ' анонимным пользователям.'
+    )
+
+
+@pytest.mark.django_db
+def test_missing_post_detail_is_404(user_client):
+    assert user_client.get('/posts/987654/').status_code == (
+        HTTPStatus.NOT_FOUND
+    )
+
+
+@pytest.mark.django_db
+def test_category_page_follows_registry_invalidation(
+    user_client, published_category
+):
+    url = f'/category/{published_category.slug}/'
+    assert user_client.get(url).status_code == HTTPStatus.OK
+    published_category.is_published = False
+    published_category.save()
+    assert user_client.get(url).status_code == HTTPStatus.NOT_FOUND, (
+        'Убедитесь, что после снятия категории с публикации её страница'
+        ' сразу становится недоступной.'
+    )
+
+
+@pytest.mark.django_db
+def test_feed_takes_category_and_location_from_registry(
+    user_client, mixer, user, published_category, published_locations
+):
+    mixer.cycle(5).blend(
+        'blog.Post', author=user, category=published_category,
+        location=mixer.sequence(*published_locations),
+    )
+    user_client.get('/')
+    with CaptureQueriesContext(connection) as captured:
+        user_client.get('/')
+    tables = ' '.join(q['sql'] for q in captured.captured_queries)
+    assert 'FROM "blog_location"' not in tables, (
+        'Убедитесь, что местоположения публикаций в ленте берутся из'
+        ' реестра, а не запрашиваются для каждой публикации.'
+    )
+
+
+@pytest.mark.django_db
+def test_create_page_does_not_load_all_locations(
+    user_client, published_locations
+):
+    response = user_client.get('/posts/create/')
+    assert response.status_code == HTTPStatus.OK
+    content = response.content.decode()
+    for location in published_locations:
+        assert f'value="{location.pk}"' not in content, (
+            'Убедитесь, что страница создания публикации не выводит'
+            ' все местоположения сразу.'
+        )
+    assert 'data-autocomplete-url' in content
+
+
+@pytest.mark.django_db
+def test_location_autocomplete(user_client, unlogged_client, mixer):
+    moscow = mixer.blend('blog.Location', name='Москва', is_published=True)
+    mixer.blend('blog.Location', name='Казань', is_published=True)
+    url = '/autocomplete/locations/'
+    assert unlogged_client.get(url).status_code == HTTPStatus.FOUND
+    results = user_client.get(url, {'q': 'мос'}).json()['results']
+    assert results == [{'id': moscow.pk, 'text': 'Москва'}]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('term', ['мос', 'МОС', 'Мос', 'мОс'])
+def test_location_autocomplete_ignores_case(user_client, mixer, term):
+    names = ['Москва', 'московская область', 'МОСКВА-СИТИ', 'деМосква']
+    for name in names + ['Казань']:
+        mixer.blend('blog.Location', name=name, is_published=True)
+    with CaptureQueriesContext(connection) as captured:
+        results = user_client.get(
+            '/autocomplete/locations/', {'q': term}
+        ).json()['results']
+    assert sorted(row['text'] for row in results) == sorted(names[:3]), (
+        'Убедитесь, что подсказка местоположений находит названия по началу'
+        ' без учёта регистра, как бы они ни были записаны.'
+    )
+    [sql] = [
+        q['sql'] for q in captured.captured_queries
+        if '"blog_location"."search_key" LIKE' in q['sql']
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+    assert 'blog_location_search_key' in plan, (
+        f'Убедитесь, что подсказка ищет по индексу ключа поиска: {plan}'
+    )
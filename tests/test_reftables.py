@@ -0,0 +1,70 @@
+import pytest
+from django.core.management import call_command
+
+from blog.reftables import ReferenceTables, dump
+from blog.registry import ReferenceRegistry
+
+
+@pytest.mark.django_db
+def test_reftables_lookup(published_category, published_locations):
+    tables = ReferenceTables(dump(7))
+    assert tables.version == 7
+    category = tables.get('category', published_category.pk)
+    for field in ('pk', 'title', 'slug', 'description', 'is_published',
+                  'created_at'):
+        assert getattr(category, field) == getattr(published_category, field)
+    assert tables.get_by_key(
+        'category', published_category.slug
+    ) == published_category
+    for location in published_locations:
+        assert tables.get('location', location.pk).name == location.name
+    assert tables.get('category', 10 ** 9) is None
+    assert tables.get_by_key('category', 'no-such-slug') is None
+
+
+@pytest.mark.django_db
+def test_registry_maps_shared_file(tmp_path, published_category):
+    path = tmp_path / 'reftables.bin'
+    registry = ReferenceRegistry(path)
+    assert registry.category(published_category.pk) == published_category
+    assert ReferenceTables.open(path).version == registry.version(), (
+        'Убедитесь, что справочные таблицы читаются из общего файла.'
+    )
+
+    type(published_category).objects.filter(
+        pk=published_category.pk
+    ).update(title='Новый заголовок')
+    registry.invalidate()
+    assert registry.category(published_category.pk).title == (
+        'Новый заголовок'
+    ), 'Убедитесь, что после изменения версии файл пересобирается.'
+    assert list(tmp_path.iterdir()) == [path], (
+        'Убедитесь, что после пересборки не остаётся временных файлов.'
+    )
+
+
+@pytest.mark.django_db
+def test_uncommitted_change_stays_private(tmp_path, published_category):
+    path = tmp_path / 'reftables.bin'
+    registry = ReferenceRegistry(path)
+    registry.version()
+    published_category.title = 'Не зафиксировано'
+    published_category.save()
+    registry.reset()
+    assert registry.category(published_category.pk).title == (
+        'Не зафиксировано'
+    )
+    shared = ReferenceTables.open(path).get('category', published_category.pk)
+    assert shared.title != 'Не зафиксировано', (
+        'Убедитесь, что незафиксированные изменения не попадают в общий'
+        ' файл справочных таблиц.'
+    )
+
+
+@pytest.mark.django_db
+def test_build_reftables_command(settings, published_category):
+    call_command('build_reftables')
+    tables = ReferenceTables.open(settings.REFTABLES_PATH)
+    assert tables.get_by_key(
+        'category', published_category.slug
+    ) == published_category
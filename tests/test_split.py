@@ -0,0 +1,63 @@
+from http import HTTPStatus
+
+import pytest
+
+from blog.split import USER_COOKIE
+
+
+@pytest.fixture
+def split_rendering(settings):
+    settings.SPLIT_RENDERING = True
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url', ['/', '/posts/{post.id}/'])
+def test_public_page_is_shared(
+    split_rendering, user_client, unlogged_client, visible_post, url
+):
+    url = url.format(post=visible_post)
+    user_response = user_client.get(url)
+    anonymous_response = unlogged_client.get(url)
+    assert user_response.status_code == HTTPStatus.OK
+    assert user_response.content == anonymous_response.content, (
+        f'Убедитесь, что в режиме раздельной отрисовки страница `{url}`'
+        ' одинакова для всех пользователей.'
+    )
+    assert 'Cookie' not in user_response.get('Vary', ''), (
+        f'Убедитесь, что ответ на `{url}` не зависит от cookie.'
+    )
+    assert 'public' in user_response['Cache-Control']
+    assert 'data-fragment="user-nav"' in user_response.content.decode()
+
+
+@pytest.mark.django_db
+def test_user_fragments(split_rendering, user, user_client, visible_post):
+    response = user_client.get(f'/fragments/?post={visible_post.id}')
+    assert response.status_code == HTTPStatus.OK
+    fragments = response.json()
+    assert user.username in fragments['user-nav'], (
+        'Убедитесь, что фрагмент шапки содержит имя пользователя.'
+    )
+    assert f'/posts/{visible_post.id}/edit/' in fragments['post-actions'], (
+        'Убедитесь, что автору приходят ссылки на редактирование публикации.'
+    )
+    assert 'csrfmiddlewaretoken' in fragments['comment-form']
+    assert 'no-cache' in response['Cache-Control']
+    assert response.cookies[USER_COOKIE].value == str(user.id), (
+        'Убедитесь, что после запроса фрагментов устанавливается cookie'
+        ' вошедшего пользователя.'
+    )
+
+
+@pytest.mark.django_db
+def test_own_unpublished_post_is_private(
+    split_rendering, user_client, unpublished_posts_with_published_locations
+):
+    post = unpublished_posts_with_published_locations[0]
+    url = f'/posts/{post.id}/'
+    response = user_client.get(url)
+    assert response.status_code == HTTPStatus.OK, (
+        'Убедитесь, что в режиме раздельной отрисовки автор видит свою'
+        ' снятую с публикации публикацию.'
+    )
+    assert 'private' in response['Cache-Control']
@@ -0,0 +1,120 @@
+import pytest
+
+from blogicum import warmup
+
+
+def test_warmup_compiles_project_templates():
+    assert warmup.compile_templates() >= 20, (
+        'Прогрев должен скомпилировать все шаблоны из каталога templates/.'
+    )
+    assert warmup.resolve_urls() > 10
+
+
+def test_check_databases_does_not_create_sqlite_file(tmp_path, monkeypatch):
+    from django.db.utils import ConnectionHandler
+
+    path = tmp_path / 'missing.sqlite3'
+    monkeypatch.setattr(warmup, 'connections', ConnectionHandler({
+        'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path},
+    }))
+    assert warmup.check_databases() == 0
+    assert not path.exists(), (
+        'Проверка базы при прогреве не должна создавать пустой файл SQLite.'
+    )
+
+
+@pytest.mark.django_db
+def test_probe_reports_first_hits():
+    import json
+
+    from django.core.handlers.wsgi import WSGIHandler
+
+    from blog.management.commands.serve import probe
+
+    result = json.loads(probe(WSGIHandler(), 0.0, ['/pages/about/']))
+    assert result['hits']['/pages/about/'] > 0
+    assert result['memory'] is None or result['memory']['rss'] > 0
+
+
+def test_setup_does_not_import_heavy_modules():
+    import subprocess
+    import sys
+
+    from django.conf import settings
+
+    script = (
+        'import sys, django; django.setup(); '
+        'print(sorted(m for m in ("PIL", "blog.admin", "django.contrib.auth'
+        '.admin", "cProfile") if m in sys.modules))'
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', script], cwd=settings.BASE_DIR,
+        capture_output=True, text=True, check=True,
+        env={'DJANGO_SETTINGS_MODULE': 'blogicum.settings', 'PATH': ''},
+    )
+    assert result.stdout.strip() == '[]', (
+        'Pillow и модули админки должны загружаться только по требованию.'
+    )
+
+
+def test_parse_importtime():
+    from blog.management.commands.bench_startup import parse_importtime
+
+    output = (
+        'import time: self [us] | cumulative | imported package\n'
+        'import time:       100 |        100 |   PIL._util\n'
+        'import time:       250 |        350 | PIL\n'
+    )
+    assert parse_importtime(output) == [
+        (1, 'PIL._util', 100, 100), (0, 'PIL', 250, 350),
+    ]
+
+
+def test_template_bundle(tmp_path):
+    import json
+
+    from django.core.management import call_command
+    from django.template import Context, Engine
+
+    bundle_path = tmp_path / 'templates.bundle'
+    call_command('compile_templates', output=str(bundle_path))
+    bundle = json.loads(bundle_path.read_text(encoding='utf-8'))
+    assert {
+        'base.html', 'blog/index.html', 'includes/post_card.html',
+        'registration/login.html', 'pages/about.html',
+        'django/forms/widgets/input.html',
+    } <= set(bundle['templates'])
+
+    bundle['templates']['base.html']['source'] = 'из пакета'
+    bundle_path.write_text(json.dumps(bundle), encoding='utf-8')
+    engine = Engine(loaders=[
+        ('blogicum.template_bundle.Loader', str(bundle_path)),
+    ])
+    assert engine.get_template('base.html').render(Context()) == 'из пакета', (
+        'Шаблоны должны загружаться из пакета, а не с диска.'
+    )
+
+
+def test_template_bundle_falls_through_when_stale(tmp_path):
+    from django.template import Context, Engine
+
+    from blogicum.template_bundle import build, collect
+
+    templates_dir = tmp_path / 'templates'
+    templates_dir.mkdir()
+    template = templates_dir / 'page.html'
+    template.write_text('старый', encoding='utf-8')
+    bundle_path = tmp_path / 'templates.bundle'
+    build(str(bundle_path), collect(Engine(dirs=[str(templates_dir)])))
+    engine = Engine(dirs=[str(templates_dir)], loaders=[
+        ('blogicum.template_bundle.Loader', str(bundle_path)),
+        'django.template.loaders.filesystem.Loader',
+    ])
+    assert engine.get_template('page.html').render(Context()) == 'старый'
+
+    template.write_text('изменённый', encoding='utf-8')
+    rendered = engine.get_template('page.html').render(Context())
+    assert rendered == 'изменённый', (
+        'Изменённый на диске шаблон должен загружаться с диска, а не из'
+        ' устаревшего пакета.'
+    )